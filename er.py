@@ -3,54 +3,73 @@
 import os
 import json
 import argparse
+import functools
+import hashlib
 import re
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Dict, Optional, Tuple
 from utils_tools.libs import translate_lib
+from utils_tools.libs.ir_lib import load_script, save_script
 
 
-names = dict()
+class ExtractContext:
+    """提取时收集的角色名表，按首次出现的顺序保存"""
 
+    def __init__(self):
+        self.names: Dict[str, None] = {}
 
-def save_names() -> List[Dict]:
-    results: List[Dict] = []
-    for n in names.keys():
-        results.append({"message": n, "is_name": True, "raw_name": n})
-    return results
-
-
-def load_names(text: List[Dict[str, str]],
-               trans_index: int) -> int:
-    global names
-    while trans_index < len(text):
-        item = text[trans_index]
-        if "is_name" in item and item["is_name"]:
-            names[item["raw_name"]] = item["message"]
-            trans_index += 1
-        else:
-            break
+    def merge_names(self, names: Iterable[str]):
+        """合并单个文件返回的名字，按文件顺序合并即可保持与逐个提取相同的顺序"""
+        for n in names:
+            self.names.setdefault(n, None)
 
-    return trans_index
+    def save_names(self) -> List[Dict]:
+        results: List[Dict] = []
+        for n in self.names.keys():
+            results.append({"message": n, "is_name": True, "raw_name": n})
+        return results
+
+
+class ReplaceContext:
+    """替换时使用的角色名译名表 {原名: 译名}"""
+
+    def __init__(self, names: Optional[Dict[str, str]] = None):
+        self.names: Dict[str, str] = dict(names or {})
+
+    def load_names(self, text: List[Dict[str, str]],
+                   trans_index: int) -> int:
+        while trans_index < len(text):
+            item = text[trans_index]
+            if "is_name" in item and item["is_name"]:
+                self.names[item["raw_name"]] = item["message"]
+                trans_index += 1
+            else:
+                break
+
+        return trans_index
 
 
-def extract_strings_from_file(file_path: str) -> List[Dict]:
+def extract_strings_from_file(file_path: str) -> Tuple[List[Dict], List[str]]:
     """
     扫描单文件，提取字符串。
-    返回的 results: 每项至少包含 'message'；若该对话有角色名则包含 'name'。
+    返回 (results, names):
+        results: 每项至少包含 'message'；若该对话有角色名则包含 'name'
+        names: 该文件用到的角色名，按出现顺序去重
     """
     results: List[Dict] = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        json_data = json.load(f)
+    json_data = load_script(file_path)
+    used_names: Dict[str, None] = {}
 
     current_name = None
 
     for op in json_data["opcodes"]:
         if op["op"] in ("12 00", "13 00", "1B 00"):
-            names[op["value"][0]] = ""
+            used_names[op["value"][0]] = None
 
         if op["op"] == "14 00":
             assert current_name == None
             current_name = op["value"][0]
-            names[current_name] = ""
+            used_names[current_name] = None
 
         if op["op"] == "10 00 00 00 00 00":
             idx = op["target_idx"]
@@ -70,20 +89,84 @@ def extract_strings_from_file(file_path: str) -> List[Dict]:
         if op["op"] == "C8 00":
             results.append({"message": op["value"][0], "is_title": True})
 
-    return results
+    return results, list(used_names)
+
+
+# ========== 切片索引 ==========
+#
+# 提取时记录每个脚本在输出列表中对应的 [start, end) 区间，替换时据此直接定位，
+# 各文件互不依赖，只需重新生成译文切片发生变化的文件。
+#
+# {"version": 1, "total": 总项数, "names": [start, end),
+#  "files": {相对路径: {"start", "end", "names": [用到的名字], "input_hash"}}}
+
+SLICES_VERSION = 1
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version() -> str:
+    """工具版本：参与替换的源码（er.py、ir_lib、translate_lib 中的操作数工具）的 hash"""
+    from utils_tools.libs import ir_lib
+    h = hashlib.sha1()
+    for path in (__file__, ir_lib.__file__, translate_lib.__file__):
+        h.update(file_hash(path).encode())
+    return h.hexdigest()
+
 
+def map_jobs(fn, arg_list: List[Tuple], jobs: int = 1) -> List:
+    """对每组参数调用 fn(*args)，jobs > 1 时在进程池中执行，结果顺序与 arg_list 一致"""
+    if jobs <= 1 or len(arg_list) <= 1:
+        return [fn(*args) for args in arg_list]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(fn, *zip(*arg_list),
+                             chunksize=max(1, len(arg_list) // (jobs * 4))))
 
-def extract_strings(path: str, output_file: str):
+
+def extract_strings(path: str, output_file: Optional[str], slices_file: Optional[str] = None,
+                    jobs: int = 1) -> List[Dict]:
+    """提取 path 下全部脚本的文本，output_file 为 None 时只返回结果不写文件"""
     files = translate_lib.collect_files(path)
+    ctx = ExtractContext()
     results = []
-    for file in files:
-        results.extend(extract_strings_from_file(file))
-
-    final_result = save_names()
+    file_slices = {}
+    for file, (file_results, file_names) in zip(files, map_jobs(extract_strings_from_file, [(file,) for file in files], jobs)):
+        ctx.merge_names(file_names)
+        start = len(results)
+        results.extend(file_results)
+        file_slices[os.path.relpath(file, start=path)] = {
+            "start": start,
+            "end": len(results),
+            "names": file_names,
+            "input_hash": file_hash(file),
+        }
+
+    final_result = ctx.save_names()
+    name_count = len(final_result)
     final_result.extend(results)
     print(f"提取了 {len(final_result)} 项")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(final_result, f, indent=2, ensure_ascii=False)
+    if output_file is not None:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(final_result, f, indent=2, ensure_ascii=False)
+
+    if slices_file is not None:
+        # 名字项在最前面，文件切片整体后移
+        for entry in file_slices.values():
+            entry["start"] += name_count
+            entry["end"] += name_count
+        with open(slices_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": SLICES_VERSION,
+                "total": len(final_result),
+                "names": [0, name_count],
+                "files": file_slices,
+            }, f, indent=2, ensure_ascii=False)
+
+    return final_result
 
 # ========== 替换 ==========
 
@@ -93,20 +176,20 @@ def replace_in_file(
     text: List[Dict[str, str]],
     output_dir: str,
     trans_index: int,
-    base_root: str
+    base_root: str,
+    ctx: ReplaceContext
 ) -> int:
     """
     替换单文件中的字符串。返回更新后的 trans_index。
     text: 全局译文列表（每项至少有 'message'，可能还含 'name'）
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        json_data = json.load(f)
+    json_data = load_script(file_path)
 
     new_opcodes = []
 
     for op in json_data["opcodes"]:
         if op["op"] in ("12 00", "13 00", "1B 00", "14 00"):
-            op["value"][0] = names[op["value"][0]]
+            op["value"][0] = ctx.names[op["value"][0]]
 
         if op["op"] == "10 00 00 00 00 00":
             trans_item = text[trans_index]
@@ -137,22 +220,140 @@ def replace_in_file(
     out_path = os.path.join(output_dir, rel)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
 
-    with open(out_path, 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, ensure_ascii=False, indent=2)
+    save_script(out_path, json_data)
 
     return trans_index
 
 
-def replace_strings(path: str, text_file: str, output_dir: str):
+def load_slices(slices_file: Optional[str], path: str, files: List[str], text: List[Dict]) -> Optional[Dict]:
+    """读取切片索引，与当前 raw 文件或译文不一致时返回 None"""
+    if slices_file is None:
+        return None
+    try:
+        with open(slices_file, 'r', encoding='utf-8') as f:
+            slices = json.load(f)
+    except (OSError, ValueError):
+        print(f"未找到有效的切片索引 {slices_file}，按顺序完整替换")
+        return None
+
+    if slices.get("version") != SLICES_VERSION or slices.get("total") != len(text):
+        print(f"切片索引 {slices_file} 与译文不一致，按顺序完整替换")
+        return None
+    rels = [os.path.relpath(file, start=path) for file in files]
+    if sorted(rels) != sorted(slices["files"]):
+        print(f"切片索引 {slices_file} 与 {path} 中的文件不一致，按顺序完整替换")
+        return None
+    for rel, file in zip(rels, files):
+        if slices["files"][rel]["input_hash"] != file_hash(file):
+            print(f"{file} 在提取后发生了变化，按顺序完整替换")
+            return None
+    return slices
+
+
+def _replace_slice(file_path: str, trans_slice: List[Dict], output_dir: str,
+                   base_root: str, ctx: ReplaceContext) -> int:
+    """替换单个文件，trans_slice 为该文件的译文切片，返回消耗的译文项数"""
+    return replace_in_file(file_path, trans_slice, output_dir, 0, base_root, ctx)
+
+
+def replace_strings_sliced(path: str, files: List[str], text: List[Dict], output_dir: str,
+                           slices: Dict, cache_file: Optional[str], jobs: int = 1):
+    """按切片索引逐文件替换，译文切片和用到的名字都未变化的文件直接跳过"""
+    ctx = ReplaceContext()
+    names_end = slices["names"][1]
+    if ctx.load_names(text, 0) != names_end:
+        print(f"错误: 名字项数量与切片索引不一致（应为 {names_end} 项）")
+        exit(1)
+
+    version = tool_version()
+
+    # old_entries 用于清理过期输出，reusable 为可以跳过的条目（替换相关的源码改动后全部失效）
+    old_entries: Dict = {}
+    reusable: Dict = {}
+    if cache_file is not None:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache["output_dir"] == output_dir:
+                old_entries = cache["files"]
+                if cache["version"] == version:
+                    reusable = old_entries
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    new_entries = {}
+    todo = []
+    for file in files:
+        rel = os.path.relpath(file, start=path)
+        entry = slices["files"][rel]
+        start, end = entry["start"], entry["end"]
+        fingerprint = hashlib.sha1(json.dumps(
+            [entry["input_hash"], text[start:end], [[n, ctx.names[n]] for n in entry["names"]]],
+            ensure_ascii=False).encode("utf-8")).hexdigest()
+
+        out_path = os.path.join(output_dir, rel)
+        old = reusable.get(rel)
+        if (old is not None and old["fingerprint"] == fingerprint
+                and os.path.isfile(out_path) and file_hash(out_path) == old["output_hash"]):
+            new_entries[rel] = old
+            continue
+        todo.append((file, rel, fingerprint, end - start))
+
+    # 每个文件只需要自己的译文切片，可以独立并行处理
+    consumed = map_jobs(_replace_slice, [
+        (file, text[slices["files"][rel]["start"]:slices["files"][rel]["end"]], output_dir, path, ctx)
+        for file, rel, _, _ in todo], jobs)
+
+    for (file, rel, fingerprint, expected), count in zip(todo, consumed):
+        if count != expected:
+            print(f"错误: {file} 消耗了 {count} 项译文，切片索引中为 {expected} 项。")
+            exit(1)
+        out_path = os.path.join(output_dir, rel)
+        new_entries[rel] = {"fingerprint": fingerprint, "output_hash": file_hash(out_path)}
+        print(f"已处理: {file}")
+    processed = len(todo)
+
+    # raw 中已不存在的文件，删除其旧输出
+    for rel in old_entries.keys() - new_entries.keys():
+        out_path = os.path.join(output_dir, rel)
+        if os.path.isfile(out_path):
+            os.remove(out_path)
+
+    print(f"处理了 {processed} 个文件，{len(files) - processed} 个文件的译文未变化已跳过")
+
+    if cache_file is not None:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": version, "output_dir": output_dir, "files": new_entries},
+                      f, indent=2, ensure_ascii=False)
+
+
+def replace_strings(path: str, text_file: str, output_dir: str,
+                    slices_file: Optional[str] = None, cache_file: Optional[str] = None,
+                    jobs: int = 1):
     with open(text_file, 'r', encoding='utf-8') as f:
         text = json.load(f)
+    replace_text(path, text, output_dir, slices_file, cache_file, jobs)
+
+
+def replace_text(path: str, text: List[Dict], output_dir: str,
+                 slices_file: Optional[str] = None, cache_file: Optional[str] = None,
+                 jobs: int = 1):
+    """用内存中的译文列表替换 path 下的全部脚本"""
     files = translate_lib.collect_files(path)
+
+    slices = load_slices(slices_file, path, files, text)
+    if slices is not None:
+        replace_strings_sliced(path, files, text, output_dir, slices, cache_file, jobs)
+        return
+
+    ctx = ReplaceContext()
     trans_index = 0
-    trans_index = load_names(text, trans_index)
+    trans_index = ctx.load_names(text, trans_index)
 
     for file in files:
         trans_index = replace_in_file(
-            file, text, output_dir, trans_index, base_root=path)
+            file, text, output_dir, trans_index, base_root=path, ctx=ctx)
         print(f"已处理: {file}")
     if trans_index != len(text):
         print(f"错误: 有 {len(text)} 项译文，但只消耗了 {trans_index}。")
@@ -169,19 +370,25 @@ def main():
     ep = subparsers.add_parser('extract', help='解包文件提取文本')
     ep.add_argument('--path', required=True, help='文件夹路径')
     ep.add_argument('--output', default='raw.json', help='输出JSON文件路径')
+    ep.add_argument('--slices', help='同时输出每个文件的译文切片索引，供增量替换使用')
+    ep.add_argument('-j', '--jobs', type=int, default=1, help='并行进程数 (默认: 1)')
 
     rp = subparsers.add_parser('replace', help='替换解包文件中的文本')
     rp.add_argument('--path', required=True, help='文件夹路径')
     rp.add_argument('--text', default='translated.json', help='译文JSON文件路径')
     rp.add_argument('--output-dir', default='translated',
                     help='输出目录(默认: translated)')
+    rp.add_argument('--slices', help='提取时生成的切片索引，指定后按文件定位译文')
+    rp.add_argument('--cache', help='增量替换缓存路径（需配合 --slices），跳过译文未变化的文件')
+    rp.add_argument('-j', '--jobs', type=int, default=1,
+                    help='并行进程数，仅在使用 --slices 时生效 (默认: 1)')
 
     args = parser.parse_args()
     if args.command == 'extract':
-        extract_strings(args.path, args.output)
+        extract_strings(args.path, args.output, args.slices, args.jobs)
         print(f"提取完成! 结果保存到 {args.output}")
     elif args.command == 'replace':
-        replace_strings(args.path, args.text, args.output_dir)
+        replace_strings(args.path, args.text, args.output_dir, args.slices, args.cache, args.jobs)
         print(f"替换完成! 结果保存到 {args.output_dir} 目录")
 
 
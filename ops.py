@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 
-import os
+import bisect
+import functools
+import gc
+import hashlib
 import json
-from typing import Dict, List, Tuple
-from utils_tools.libs.ops_lib import EndParsing, Handler, assemble_one_op, fix_offset,  flat, h, parse_data, string, u32, u16, i32
-from utils_tools.libs.translate_lib import collect_files, de, se
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+from utils_tools.libs.ops_lib import EndParsing, Handler, OpcodeMap, assemble_one_op, assemble_script, fix_offset, flat, h, parse_data, string, u32, u16, i32
+from utils_tools.libs.ir_lib import SCRIPT_FORMATS, load_script, save_script
+from utils_tools.libs.translate_lib import collect_files
 
 
 def end_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[None, int]:
@@ -19,9 +26,12 @@ def end_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[None, int]:
 
 end = Handler(end_handler)
 
+# 单个文件的处理结果：(日志, 错误, 输出文件)
+FileResult = Tuple[List[str], List[str], str | None]
+
 
 def get_a9_indices(op: Dict) -> List[int]:
-    count, _ = de(op['value'][0])
+    _, count = op['value'][0]
     return list(range(1, 1 + count))
 
 
@@ -154,99 +164,359 @@ OPCODES_MAP = flat({
 })
 
 
-def disasm_mode(input_path: str, output_path: str):
-    """反汇编模式：将二进制文件转换为JSON"""
-    files = collect_files(input_path)
+def describe_bad_text_target(op: Dict, offset: int, text_offsets: List[int]) -> str:
+    """描述一个没有落在文本段开头的文本偏移"""
+    i = bisect.bisect_right(text_offsets, offset) - 1
+    if i < 0:
+        return f"OP #{op['index']} (offset {hex(op['offset'])}) 指向 {hex(offset)}，不在文本区内"
+    return (f"OP #{op['index']} (offset {hex(op['offset'])}) 指向 {hex(offset)}，"
+            f"位于文本段 {i} (起始 {hex(text_offsets[i])}) 中间")
 
-    for file in files:
-        with open(file, "rb") as f:
-            data = f.read()
 
-        json_file = {}
+def disasm_file(file: str, input_path: str, output_path: str, fmt: str = "json") -> FileResult:
+    """反汇编单个文件，返回 (日志, 错误, 输出文件)，有错误时不输出该文件"""
+    logs: List[str] = []
+    with open(file, "rb") as f:
+        data = f.read()
+
+    json_file = {}
 
-        # parse_data 返回 opcodes 列表和 text_offset（文本区开始偏移）
-        opcodes, text_offset = parse_data({
-            "file_name": file,
-            "offset": 0,
-        }, data, OPCODES_MAP)
-        text_data = data[text_offset:]
+    # parse_data 返回 opcodes 列表和 text_offset（文本区开始偏移）
+    opcodes, text_offset = parse_data({
+        "file_name": file,
+        "offset": 0,
+    }, data, OPCODES_MAP, log=logs.append)
+    text_data = data[text_offset:]
+
+    # 确保正确解析了真正的终止OP
+    if text_data.find(b"\xC2\x00") != -1:
+        return logs, [f"文本区 ({hex(text_offset)} 起) 中仍有终止 OP，opcode 区解析不完整"], None
+
+    json_file["opcodes"] = opcodes
+    json_file["text"] = []
+
+    # 把文本区切分为以 0 结尾的字符串，记录每段文本的原始 offset
+    text_offsets = []
+    offset_to_idx = {}
+    for seg in text_data.split(b'\x00')[:-1]:
+        offset_to_idx[text_offset] = len(text_offsets)
+        text_offsets.append(text_offset)
+        json_file["text"].append(
+            {"value": seg.decode("cp932"), "offset": text_offset})
+        text_offset += len(seg) + 1
+
+    # 为指向文本的 OP 添加 target_idx 字段（以方便后续 asm）
+    errors = []
+    for op in json_file["opcodes"]:
+        if op["op"] == "10 00 00 00 00 00":
+            _type, old_offset = op['value'][1]
+            idx = offset_to_idx.get(old_offset)
+            if idx is None:
+                errors.append(describe_bad_text_target(
+                    op, old_offset, text_offsets))
+                continue
+            op['target_idx'] = idx
+
+    if errors:
+        return logs, errors, None
+
+    # 保存为JSON
+    rel_path = os.path.relpath(file, start=input_path)
+    out_file = os.path.join(output_path, f"{rel_path}.{fmt}")
+    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+
+    save_script(out_file, json_file)
+    return logs, errors, out_file
+
+
+def asm_file(file: str, input_path: str, output_path: str, fmt: str = "json") -> FileResult:
+    """汇编单个文件，返回 (日志, 错误, 输出文件)"""
+    json_data = load_script(file)
+
+    # 文本区按原顺序追加在 opcode 区之后，opcode 与文本的偏移在汇编时一并修复
+    text_segments = [(text['offset'], text['value'].encode('cp932') + b'\x00')
+                     for text in json_data['text']]
+    new_blob = assemble_script(
+        file, json_data['opcodes'], text_segments, FIX_OPS_MAP)
+
+    # 保存二进制文件
+    rel_path = os.path.relpath(file, start=input_path)
+    rel_path = rel_path[:-len(fmt) - 1]  # 移除.json/.bin扩展名
+    out_file = os.path.join(output_path, rel_path)
+    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+
+    with open(out_file, 'wb') as f:
+        f.write(new_blob)
+    return [], [], out_file
+
+
+def _run_file(worker: Callable, file: str, *args) -> FileResult:
+    """执行单个文件的处理，异常转为该文件的错误报告"""
+    try:
+        return worker(file, *args)
+    except Exception as e:
+        return [], [f"{type(e).__name__}: {e}"], None
+
+
+# ==========================================
+# 增量缓存
+# ==========================================
+
+CACHE_VERSION = 1
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version() -> str:
+    """工具版本：参与反汇编/汇编的源码的 hash，任何改动都会使缓存失效"""
+    from utils_tools.libs import ir_lib, ops_lib, translate_lib
+    h = hashlib.sha1(str(CACHE_VERSION).encode())
+    for path in (__file__, ops_lib.__file__, ir_lib.__file__, translate_lib.__file__):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def load_cache(path: str, mode: str, fmt: str) -> Tuple[Dict, Dict]:
+    """
+    读取缓存 manifest，返回 (可复用的条目, 全部条目)。
+    manifest 缺失、损坏或与当前工具版本/模式/格式不一致时没有可复用的条目，
+    但全部条目仍用于清理过期的输出。
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        entries = cache["files"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}, {}
+
+    if (cache.get("version") != CACHE_VERSION or cache.get("tool") != tool_version()
+            or cache.get("mode") != mode or cache.get("format") != fmt):
+        return {}, entries
+    return entries, entries
+
+
+def save_cache(path: str, mode: str, fmt: str, entries: Dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": CACHE_VERSION,
+            "tool": tool_version(),
+            "mode": mode,
+            "format": fmt,
+            "files": entries,
+        }, f, indent=2, ensure_ascii=False)
+
+
+def run_files(worker: Callable, files: List[str], args: Tuple, jobs: int = 1,
+              action: str = "处理", cache_path: str | None = None):
+    """
+    逐个（jobs > 1 时在进程池中）处理文件。
+    各文件的日志和错误按 files 的顺序统一输出，有错误时以状态码 1 退出。
+
+    指定 cache_path 时维护增量缓存：每个输入文件记录输入 hash、输出文件及其 hash，
+    输入和输出都未变化的文件直接跳过；输入已不存在的文件，其旧输出会被删除。
+    缓存中的路径相对于输入/输出文件夹（args 的前两项）。
+    """
+    input_path, output_path = args[0], args[1]
+    mode = worker.__name__
+    fmt = args[2]
+
+    old_entries: Dict = {}
+    entries: Dict = {}
+    todo = files
+    if cache_path is not None:
+        reusable, old_entries = load_cache(cache_path, mode, fmt)
+        todo = []
+        for file in files:
+            rel = os.path.relpath(file, start=input_path)
+            digest = file_hash(file)
+            entry = reusable.get(rel)
+            if entry is not None and entry["input"] == digest:
+                out_file = os.path.join(output_path, entry["output"])
+                if os.path.isfile(out_file) and file_hash(out_file) == entry["output_hash"]:
+                    entries[rel] = entry
+                    continue
+            entries[rel] = {"input": digest}
+            todo.append(file)
+
+    if jobs <= 1 or len(todo) <= 1:
+        results = [_run_file(worker, file, *args) for file in todo]
+    else:
+        run = functools.partial(_run_file, worker)
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(run, todo, *[[a] * len(todo) for a in args],
+                                    chunksize=max(1, len(todo) // (jobs * 4))))
+
+    failed = []
+    for file, (logs, errors, out_file) in zip(todo, results):
+        for line in logs:
+            print(line)
+        rel = os.path.relpath(file, start=input_path)
+        if errors:
+            failed.append((file, errors))
+            # 失败的文件不写入缓存，下次重新处理
+            entries.pop(rel, None)
+        elif cache_path is not None:
+            entries[rel]["output"] = os.path.relpath(out_file, start=output_path)
+            entries[rel]["output_hash"] = file_hash(out_file)
+
+    if cache_path is not None:
+        # 输入已被删除、处理失败或输出路径改变（如切换了格式）的文件，其旧输出一并删除
+        stale = 0
+        for rel, entry in old_entries.items():
+            old_output = entry.get("output")
+            if old_output is None or entries.get(rel, {}).get("output") == old_output:
+                continue
+            out_file = os.path.join(output_path, old_output)
+            if os.path.isfile(out_file):
+                os.remove(out_file)
+                stale += 1
+        save_cache(cache_path, mode, fmt, entries)
+        print(f"缓存: {len(files) - len(todo)} 个文件未变化已跳过, "
+              f"{len(todo)} 个已{action}, 删除 {stale} 个过期输出")
+
+    if failed:
+        print(f"错误: {len(failed)} 个文件{action}失败，未输出这些文件:")
+        for file, errors in failed:
+            print(f"  {file}:")
+            for error in errors:
+                print(f"    {error}")
+        exit(1)
+
+
+def disasm_mode(input_path: str, output_path: str, fmt: str = "json", jobs: int = 1,
+                cache_path: str | None = None):
+    """反汇编模式：将二进制文件转换为JSON（或 bin 中间格式）"""
+    files = collect_files(input_path)
+    run_files(disasm_file, files, (input_path, output_path, fmt), jobs, "反汇编", cache_path)
 
-        # 确保正确解析了真正的终止OP
-        assert text_data.find(b"\xC2\x00") == -1
 
-        json_file["opcodes"] = opcodes
-        json_file["text"] = []
+def asm_mode(input_path: str, output_path: str, fmt: str = "json", jobs: int = 1,
+             cache_path: str | None = None):
+    """汇编模式：将JSON（或 bin 中间格式）转换回二进制文件"""
+    files = collect_files(input_path, fmt)
+    run_files(asm_file, files, (input_path, output_path, fmt), jobs, "汇编", cache_path)
 
-        # 把文本区切分为以 0 结尾的字符串，记录每段文本的原始 offset
-        for seg in text_data.split(b'\x00')[:-1]:
-            json_file["text"].append(
-                {"value": seg.decode("cp932"), "offset": text_offset})
-            text_offset += len(seg) + 1
 
-        # 为指向文本的 OP 添加 target_idx 字段（以方便后续 asm）
-        for op in json_file["opcodes"]:
-            if op["op"] == "10 00 00 00 00 00":
-                old_offset, _type = de(op['value'][1])
-                idx = next((i for i, t in enumerate(
-                    json_file["text"]) if t["offset"] == old_offset), None)
-                assert idx != None
-                op['target_idx'] = idx
+def convert_mode(input_path: str, output_path: str, fmt: str):
+    """格式转换模式：把 json/bin 脚本统一转换为 fmt 格式"""
+    files = [file for file in collect_files(input_path)
+             if file.lower().endswith((".json", ".bin"))]
+
+    for file in files:
+        script = load_script(file)
 
-        # 保存为JSON
         rel_path = os.path.relpath(file, start=input_path)
-        out_file = os.path.join(output_path, rel_path + ".json")
+        rel_path = os.path.splitext(rel_path)[0]
+        out_file = os.path.join(output_path, f"{rel_path}.{fmt}")
         os.makedirs(os.path.dirname(out_file), exist_ok=True)
 
-        with open(out_file, 'w', encoding='utf-8') as f:
-            json.dump(json_file, f, ensure_ascii=False, indent=2)
+        save_script(out_file, script)
 
 
-def asm_mode(input_path: str, output_path: str):
-    """汇编模式：将JSON转换回二进制文件"""
-    files = collect_files(input_path, "json")
-
+def bench_mode(input_path: str):
+    """性能测试：在 input_path 的全部脚本上对比各实现的耗时"""
+    files = collect_files(input_path)
+    samples = []
     for file in files:
-        with open(file, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        with open(file, "rb") as f:
+            data = f.read()
+        opcodes, _ = parse_data({
+            "file_name": file,
+            "offset": 0,
+        }, data, OPCODES_MAP)
+        samples.append((data, [op["offset"] for op in opcodes]))
+    count = sum(len(offsets) for _, offsets in samples)
+    print(f"{len(files)} 个文件, {count} 条 opcode")
+
+    # opcode 匹配：按长度降序线性扫描 vs 首字节分发 + 前缀树
+    sorted_keys = sorted(OPCODES_MAP.keys(), key=len, reverse=True)
+
+    def linear_match(data, offset):
+        for signature in sorted_keys:
+            if data.startswith(signature, offset):
+                return signature
+
+    start = time.perf_counter()
+    for data, offsets in samples:
+        for offset in offsets:
+            linear_match(data, offset)
+    t_linear = time.perf_counter() - start
+
+    match = OPCODES_MAP.match
+    start = time.perf_counter()
+    for data, offsets in samples:
+        for offset in offsets:
+            match(data, offset)
+    t_trie = time.perf_counter() - start
+
+    print(f"opcode 匹配: 线性扫描 {t_linear:.3f}s, 前缀树 {t_trie:.3f}s "
+          f"({t_linear / t_trie:.1f}x)")
+
+    # 操作数解码：逐个调用 Handler vs 预编译的 struct 计划
+    generic_map = OpcodeMap(OPCODES_MAP, fuse_layouts=False)
+    results = {}
+    timings = {}
+    for name, opcodes_map in (("generic", generic_map), ("compiled", OPCODES_MAP)):
+        # 前一轮的结果仍在内存中，关闭 gc 以免后一轮额外承担回收开销
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            results[name] = [parse_data({"file_name": file, "offset": 0}, data, opcodes_map)
+                             for file, (data, _) in zip(files, samples)]
+            timings[name] = time.perf_counter() - start
+        finally:
+            gc.enable()
+    assert results["generic"] == results["compiled"], "预编译计划的解析结果不一致"
+
+    print(f"操作数解码: Handler 链 {timings['generic']:.3f}s, "
+          f"预编译计划 {timings['compiled']:.3f}s "
+          f"({timings['generic'] / timings['compiled']:.1f}x)")
+
+    # 汇编：assemble_one_op 两遍 + fix_offset vs 单遍 assemble_script
+    scripts = []
+    for file, (opcodes, text_offset) in zip(files, results["compiled"]):
+        with open(file, "rb") as f:
+            text_data = f.read()[text_offset:]
+        segments = []
+        for seg in text_data.split(b'\x00')[:-1]:
+            segments.append((text_offset, seg + b'\x00'))
+            text_offset += len(seg) + 1
+        scripts.append((file, opcodes, segments))
 
-        # ========= 第一步：assemble opcode，计算新 offset =========
-        old2new = {}          # old_offset -> new_offset
+    def two_pass(file, opcodes, segments):
+        opcodes = [dict(op, value=list(op["value"])) for op in opcodes]
+        old2new = {}
         cursor = 0
-        opcodes = json_data['opcodes']
-
         for op in opcodes:
-            old_offset = op["offset"]
-            b = assemble_one_op(op)
+            old2new[op["offset"]] = cursor
+            cursor += len(assemble_one_op(op))
+        for old_offset, seg in segments:
             old2new[old_offset] = cursor
-            cursor += len(b)
-
-        # ========= 第二步：处理文本区，建立文本偏移映射并构造 text_blob =========
-        text_blob_parts: List[bytes] = []
-
-        for text in json_data['text']:
-            old_text_offset = text['offset']
-            old2new[old_text_offset] = cursor
-            seg = text['value'].encode('cp932') + b'\x00'
-            text_blob_parts.append(seg)
             cursor += len(seg)
+        fix_offset(file, opcodes, old2new, FIX_OPS_MAP)
+        return b"".join([assemble_one_op(op) for op in opcodes]) + \
+            b"".join(seg for _, seg in segments)
 
-        text_blob = b"".join(text_blob_parts)
-
-        # ========= 第三步：修复 opcodes 中偏移（包括指向 opcode 区和文本区的偏移） =========
-        opcodes = fix_offset(file, opcodes, old2new, FIX_OPS_MAP)
+    def single_pass(file, opcodes, segments):
+        return assemble_script(file, opcodes, segments, FIX_OPS_MAP)
 
-        # ========= 第四步：assemble 修复过跳转的 opcodes 并拼接文本区生成最终二进制 =========
-        new_blob = b"".join([assemble_one_op(op) for op in opcodes])
-        new_blob += text_blob
+    outputs = {}
+    for name, assemble in (("two_pass", two_pass), ("single_pass", single_pass)):
+        start = time.perf_counter()
+        outputs[name] = [assemble(*script) for script in scripts]
+        timings[name] = time.perf_counter() - start
+    assert outputs["two_pass"] == outputs["single_pass"], "单遍汇编结果不一致"
 
-        # 保存二进制文件
-        rel_path = os.path.relpath(file, start=input_path)
-        rel_path = rel_path[:-5]  # 移除.json扩展名
-        out_file = os.path.join(output_path, rel_path)
-        os.makedirs(os.path.dirname(out_file), exist_ok=True)
-
-        with open(out_file, 'wb') as f:
-            f.write(new_blob)
+    print(f"汇编: 两遍 {timings['two_pass']:.3f}s, "
+          f"单遍 {timings['single_pass']:.3f}s "
+          f"({timings['two_pass'] / timings['single_pass']:.1f}x)")
 
 
 def main():
@@ -254,18 +524,33 @@ def main():
 
     parser = argparse.ArgumentParser(description='游戏脚本反汇编/汇编工具')
     parser.add_argument(
-        'mode', choices=['disasm', 'asm'], help='模式: disasm(反汇编) 或 asm(汇编)')
+        'mode', choices=['disasm', 'asm', 'convert', 'bench'],
+        help='模式: disasm(反汇编), asm(汇编), convert(json/bin 互转) 或 bench(性能测试)')
     parser.add_argument('input', help='输入文件夹路径')
-    parser.add_argument('output', help='输出文件夹路径')
+    parser.add_argument('output', nargs='?', help='输出文件夹路径 (bench 模式不需要)')
+    parser.add_argument('--format', choices=SCRIPT_FORMATS, default='json',
+                        help='中间格式: disasm 的输出 / asm 的输入 / convert 的目标格式 (默认: json)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='disasm/asm 的并行进程数 (默认: 1)')
+    parser.add_argument('--cache',
+                        help='disasm/asm 的增量缓存 manifest 路径，跳过未变化的文件 (不能放在输出文件夹内)')
 
     args = parser.parse_args()
 
+    if args.mode != 'bench' and args.output is None:
+        parser.error(f"{args.mode} 模式需要输出文件夹路径")
+
     if args.mode == 'disasm':
-        disasm_mode(args.input, args.output)
+        disasm_mode(args.input, args.output, args.format, args.jobs, args.cache)
         print(f"反汇编完成: {args.input} -> {args.output}")
     elif args.mode == 'asm':
-        asm_mode(args.input, args.output)
+        asm_mode(args.input, args.output, args.format, args.jobs, args.cache)
         print(f"汇编完成: {args.input} -> {args.output}")
+    elif args.mode == 'convert':
+        convert_mode(args.input, args.output, args.format)
+        print(f"转换完成: {args.input} -> {args.output}")
+    elif args.mode == 'bench':
+        bench_mode(args.input)
 
 
 if __name__ == "__main__":
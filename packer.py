@@ -1,8 +1,19 @@
 #!/usr/bin/env python3
 
 import argparse
+import hashlib
+import heapq
+import json
+import mmap
+import shutil
 import struct
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional, Tuple
 
 
 # ----------------- Decoder -----------------
@@ -95,7 +106,8 @@ def build_huffman_tree(codes):
     return nodes
 
 
-def dsc_decompress(data: bytes) -> bytes:
+def read_dsc_header(data: bytes):
+    """解析 DSC 头部和 Huffman depth 表，返回 (codes, 码流起始位置, 解压大小, 符号数)"""
     magic = struct.unpack_from("<H", data, 0)[0] << 16
     key = struct.unpack_from("<I", data, 0x10)[0]
     unpacked_size = struct.unpack_from("<I", data, 0x14)[0]
@@ -113,6 +125,12 @@ def dsc_decompress(data: bytes) -> bytes:
             codes.append((i, d))
 
     codes.sort(key=lambda x: (x[1], x[0]))
+    return codes, pos, unpacked_size, dec_count
+
+
+def dsc_decompress_tree(data: bytes) -> bytes:
+    """参考实现：逐 bit 遍历 Huffman 树解码"""
+    codes, pos, unpacked_size, dec_count = read_dsc_header(data)
     hnodes = build_huffman_tree(codes)
 
     bs = MsbBitStream(data, pos)
@@ -142,62 +160,718 @@ def dsc_decompress(data: bytes) -> bytes:
     return bytes(out)
 
 
+HUFFMAN_TABLE_BITS = 10
+
+
+def assign_canonical_codes(codes):
+    """
+    为按 (深度, 符号) 排序的 (符号, 深度) 列表分配 canonical 编码
+    返回 [(符号, 码长, 编码), ...]
+    """
+    assigned = []
+    code = 0
+    prev_len = codes[0][1] if codes else 0
+    for sym, length in codes:
+        code <<= length - prev_len
+        prev_len = length
+        assigned.append((sym, length, code))
+        code += 1
+    return assigned
+
+
+def build_huffman_table(codes, table_bits=HUFFMAN_TABLE_BITS):
+    """
+    根据 (符号, 深度) 列表构建两级查找表
+
+    与 build_huffman_tree 的建树方式等价：同一深度的叶子从左到右依次分配，
+    即标准的 canonical Huffman 编码。
+    返回 (主表位数, 主表)，主表项为 (符号, 码长, 子表)：
+        - 码长 <= 主表位数时子表为 None
+        - 否则符号为 -1，码长为子表位数，子表项为 (符号, 剩余码长)
+    """
+    max_len = max((d for _, d in codes), default=1)
+    table_bits = min(table_bits, max_len)
+
+    assigned = assign_canonical_codes(codes)
+
+    table = [(0, 0, None)] * (1 << table_bits)
+
+    # 长码按主表前缀分组，求每组子表的位数
+    sub_bits = {}
+    for sym, length, code in assigned:
+        if length <= table_bits:
+            shift = table_bits - length
+            base = code << shift
+            entry = (sym, length, None)
+            for i in range(base, base + (1 << shift)):
+                table[i] = entry
+        else:
+            prefix = code >> (length - table_bits)
+            sub_bits[prefix] = max(sub_bits.get(prefix, 0), length - table_bits)
+
+    subtables = {}
+    for prefix, bits in sub_bits.items():
+        subtables[prefix] = [(0, 0)] * (1 << bits)
+        table[prefix] = (-1, bits, subtables[prefix])
+
+    for sym, length, code in assigned:
+        if length > table_bits:
+            prefix = code >> (length - table_bits)
+            bits = sub_bits[prefix]
+            rest_len = length - table_bits
+            rest = code & ((1 << rest_len) - 1)
+            shift = bits - rest_len
+            base = rest << shift
+            sub = subtables[prefix]
+            for i in range(base, base + (1 << shift)):
+                sub[i] = (sym, rest_len)
+
+    return table_bits, table
+
+
+def dsc_decompress_table(data: bytes) -> bytes:
+    """查表实现：每个符号通过一到两次查表解出"""
+    codes, pos, unpacked_size, dec_count = read_dsc_header(data)
+    table_bits, table = build_huffman_table(codes)
+    max_len = max((d for _, d in codes), default=1)
+    # 一次补齐足够解出一个符号以及随后的 12 位偏移
+    need = max_len + 12
+
+    out = bytearray(unpacked_size)
+    dst = 0
+    size = len(data)
+    bits = 0
+    cached = 0
+    table_mask = (1 << table_bits) - 1
+
+    for _ in range(dec_count):
+        while cached < need:
+            # 数据耗尽后补 0，只会影响损坏的数据
+            bits = (bits << 8) | (data[pos] if pos < size else 0)
+            pos += 1
+            cached += 8
+
+        code, length, sub = table[(bits >> (cached - table_bits)) & table_mask]
+        cached -= table_bits if sub is not None else length
+        if sub is not None:
+            code, length = sub[(bits >> (cached - length)) & ((1 << length) - 1)]
+            cached -= length
+
+        if code >= 256:
+            cached -= 12
+            offset = ((bits >> cached) & 0xFFF) + 2
+            count = (code & 0xFF) + 2
+            src = dst - offset
+            if offset >= count:
+                out[dst:dst+count] = out[src:src+count]
+            else:
+                for i in range(count):
+                    out[dst+i] = out[src+i]
+            dst += count
+        else:
+            out[dst] = code
+            dst += 1
+
+        bits &= (1 << cached) - 1
+
+    return bytes(out)
+
+
+DSC_DECODERS = {
+    "table": dsc_decompress_table,
+    "tree": dsc_decompress_tree,
+}
+
+
+def dsc_decompress(data: bytes, decoder: str = "table") -> bytes:
+    return DSC_DECODERS[decoder](data)
+
+
+def decode_entry(data, decoder: str = "table") -> bytes:
+    """解码 ARC 条目：DSC 压缩的条目解压，未压缩的条目原样返回"""
+    if bytes(data[:len(DSC_SIGNATURE)]) != DSC_SIGNATURE:
+        return bytes(data)
+    return dsc_decompress(data, decoder)
+
+
 # ----------------- Decoder -----------------
 
 
-ARC_SIGNATURE = b"PackFile    "
-INDEX_ENTRY_SIZE = 0x20
+# ----------------- Encoder -----------------
+
+DSC_SIGNATURE = b"DSC FORMAT 1.00\x00"
+DSC_MIN_MATCH = 2
+DSC_MAX_MATCH = 257
+DSC_MIN_DISTANCE = 2
+DSC_MAX_DISTANCE = 0xFFF + 2
+# 限制码长，避免极端分布下树过深
+DSC_MAX_CODE_LEN = 16
+
+# 压缩等级 -> (哈希链最大查找次数, 惰性匹配, 最优解析)
+DSC_LEVELS = {
+    1: (4, False, False),
+    2: (8, False, False),
+    3: (16, False, False),
+    4: (16, True, False),
+    5: (32, True, False),
+    6: (64, True, False),
+    7: (128, True, False),
+    8: (256, True, False),
+    9: (256, True, True),
+}
+DSC_DEFAULT_LEVEL = 6
+
+
+class MatchFinder:
+    """
+    4 KiB 窗口内的回溯查找器，以 2 字节前缀为键的哈希链实现
+
+    head 记录每个前缀最近出现的位置，prev[pos] 指向同前缀的上一个位置。
+    find(i) 会先把 i 之前的所有位置插入链中。
+    """
+
+    def __init__(self, data: bytes, max_chain: int):
+        self.data = data
+        self.size = len(data)
+        self.max_chain = max_chain
+        self.head = {}
+        self.prev = [-1] * self.size
+        self.inserted = 0
+
+    def find(self, i: int) -> Tuple[int, int]:
+        """返回位置 i 处的最长匹配 (长度, 距离)，无匹配时长度为 0"""
+        data = self.data
+        head = self.head
+        prev = self.prev
+
+        end = min(i, self.size - 1)
+        for k in range(self.inserted, end):
+            key = (data[k] << 8) | data[k + 1]
+            prev[k] = head.get(key, -1)
+            head[key] = k
+        self.inserted = max(self.inserted, end)
+
+        if i + DSC_MIN_MATCH > self.size:
+            return 0, 0
+
+        max_len = min(DSC_MAX_MATCH, self.size - i)
+        limit = max(i - DSC_MAX_DISTANCE, 0)
+        best_len = 0
+        best_dist = 0
+        tried = 0
+
+        j = head.get((data[i] << 8) | data[i + 1], -1)
+        while j >= limit and tried < self.max_chain:
+            if i - j >= DSC_MIN_DISTANCE:
+                tried += 1
+                # 先比较当前最优长度处的字节，快速排除不可能更长的候选
+                if data[j + best_len] == data[i + best_len]:
+                    n = match_length(data, j, i, max_len)
+                    if n > best_len:
+                        best_len = n
+                        best_dist = i - j
+                        if n == max_len:
+                            break
+            j = prev[j]
+
+        return best_len, best_dist
+
+
+def lz_parse(data: bytes, level: int = DSC_DEFAULT_LEVEL):
+    """
+    LZ 解析，返回 (符号列表, 偏移列表)
+    符号 < 256 为字面量；符号 >= 256 为回溯，长度为 (符号 & 0xFF) + 2，
+    对应偏移列表中的值为距离 - 2，字面量的偏移为 -1
+    """
+    max_chain, lazy, optimal = DSC_LEVELS[level]
+    syms, offs = lz_parse_lazy(data, max_chain, lazy)
+    if optimal:
+        syms, offs = lz_parse_optimal(data, max_chain, syms)
+    return syms, offs
+
+
+def lz_parse_lazy(data: bytes, max_chain: int, lazy: bool):
+    """贪心/惰性解析：lazy 时若下一位置的匹配更长，则当前位置输出字面量"""
+    syms = []
+    offs = []
+    size = len(data)
+    finder = MatchFinder(data, max_chain)
+    i = 0
+    cur = finder.find(0)
+
+    while i < size:
+        length, dist = cur
+        if length >= DSC_MIN_MATCH and lazy and length < DSC_MAX_MATCH and i + 1 < size:
+            nxt = finder.find(i + 1)
+            if nxt[0] > length:
+                syms.append(data[i])
+                offs.append(-1)
+                i += 1
+                cur = nxt
+                continue
+
+        if length >= DSC_MIN_MATCH:
+            syms.append(256 + length - 2)
+            offs.append(dist - 2)
+            i += length
+        else:
+            syms.append(data[i])
+            offs.append(-1)
+            i += 1
+
+        if i < size:
+            cur = finder.find(i)
+
+    return syms, offs
+
+
+def lz_parse_optimal(data: bytes, max_chain: int, syms):
+    """
+    最优解析：以初步解析得到的 Huffman 码长作为代价，对每个位置的全部
+    可选长度做最短路径动态规划。距离固定占 12 位，因此每个位置只需最长匹配。
+    """
+    freqs = [0] * 512
+    for s in syms:
+        freqs[s] += 1
+    depths = huffman_code_lengths(freqs)
+    # 未出现过的符号按最长码长估算
+    costs = [d if d else DSC_MAX_CODE_LEN for d in depths]
+    match_costs = [0, 0] + [costs[256 + n - 2] + 12
+                            for n in range(DSC_MIN_MATCH, DSC_MAX_MATCH + 1)]
+
+    size = len(data)
+    finder = MatchFinder(data, max_chain)
+    matches = [finder.find(i) for i in range(size)]
+
+    inf = float("inf")
+    cost = [inf] * (size + 1)
+    step = [0] * (size + 1)
+    cost[0] = 0
+
+    for i in range(size):
+        base = cost[i]
+        c = base + costs[data[i]]
+        if c < cost[i + 1]:
+            cost[i + 1] = c
+            step[i + 1] = 1
+
+        length = matches[i][0]
+        for n in range(DSC_MIN_MATCH, length + 1):
+            c = base + match_costs[n]
+            if c < cost[i + n]:
+                cost[i + n] = c
+                step[i + n] = n
+
+    # 回溯得到解析路径
+    path = []
+    i = size
+    while i > 0:
+        path.append(step[i])
+        i -= step[i]
+    path.reverse()
+
+    out_syms = []
+    out_offs = []
+    i = 0
+    for n in path:
+        if n == 1:
+            out_syms.append(data[i])
+            out_offs.append(-1)
+        else:
+            out_syms.append(256 + n - 2)
+            out_offs.append(matches[i][1] - 2)
+        i += n
+
+    return out_syms, out_offs
+
+
+def match_length(data: bytes, src: int, dst: int, max_len: int) -> int:
+    """计算 data[src:] 与 data[dst:] 的公共前缀长度（允许重叠）"""
+    n = 0
+    # 先按块比较，再逐字节收尾
+    while n + 16 <= max_len and data[src + n:src + n + 16] == data[dst + n:dst + n + 16]:
+        n += 16
+    while n < max_len and data[src + n] == data[dst + n]:
+        n += 1
+    return n
+
+
+def huffman_code_lengths(freqs, max_len: int = DSC_MAX_CODE_LEN):
+    """根据频率计算各符号码长，超出 max_len 时压缩频率后重建"""
+    freqs = list(freqs)
+    used = [s for s, f in enumerate(freqs) if f]
+    # 至少需要两个叶子才能构成完整的树
+    for s in range(len(freqs)):
+        if len(used) >= 2:
+            break
+        if not freqs[s]:
+            freqs[s] = 1
+            used.append(s)
+
+    while True:
+        depths = [0] * len(freqs)
+        heap = [(freqs[s], s, [s]) for s in used]
+        heapq.heapify(heap)
+        tie = len(freqs)
+        while len(heap) > 1:
+            f1, _, a = heapq.heappop(heap)
+            f2, _, b = heapq.heappop(heap)
+            merged = a + b
+            for s in merged:
+                depths[s] += 1
+            heapq.heappush(heap, (f1 + f2, tie, merged))
+            tie += 1
+
+        if max(depths) <= max_len:
+            return depths
+
+        freqs = [(f >> 1) | 1 if f else 0 for f in freqs]
+
+
+def dsc_compress(data: bytes, level: int = DSC_DEFAULT_LEVEL) -> bytes:
+    """DSC 压缩，dsc_decompress 的逆过程，level 为 1~9 的压缩等级"""
+    syms, offs = lz_parse(data, level)
+
+    freqs = [0] * 512
+    for s in syms:
+        freqs[s] += 1
+    depths = huffman_code_lengths(freqs)
+
+    codes = sorted(((s, d) for s, d in enumerate(depths) if d),
+                   key=lambda x: (x[1], x[0]))
+    table = {sym: (code, length)
+             for sym, length, code in assign_canonical_codes(codes)}
+
+    key = zlib.crc32(data)
+    magic = struct.unpack_from("<H", DSC_SIGNATURE, 0)[0] << 16
+    keygen = BgiKey(key, magic)
 
+    out = bytearray(DSC_SIGNATURE)
+    out += struct.pack("<IIII", key, len(data), len(syms), 0)
+    out += bytes((d + keygen.update()) & 0xFF for d in depths)
+
+    # MSB 优先写入码流
+    bits = 0
+    cached = 0
+    for s, off in zip(syms, offs):
+        code, length = table[s]
+        bits = (bits << length) | code
+        cached += length
+        if off >= 0:
+            bits = (bits << 12) | off
+            cached += 12
+        while cached >= 8:
+            cached -= 8
+            out.append((bits >> cached) & 0xFF)
+        bits &= (1 << cached) - 1
+
+    if cached:
+        out.append((bits << (8 - cached)) & 0xFF)
 
-def read_u32(f):
-    return struct.unpack("<I", f.read(4))[0]
+    return bytes(out)
+
+
+# ----------------- Encoder -----------------
+
+
+ARC_SIGNATURE = b"PackFile    "
+INDEX_ENTRY_SIZE = 0x20
 
 
 def write_u32(f, v):
     f.write(struct.pack("<I", v))
 
 
-def unpack(input_path: Path, out_dir: Path):
-    out_dir.mkdir(parents=True, exist_ok=True)
+def parse_index(buf):
+    """解析 ARC 索引，返回 (数据区起始位置, [(name, offset, size), ...])"""
+    if bytes(buf[:12]) != ARC_SIGNATURE:
+        raise ValueError("不是有效的 BGI ARC 文件")
 
-    with input_path.open("rb") as f:
-        sig = f.read(12)
+    count = struct.unpack_from("<I", buf, 12)[0]
 
-        if sig != ARC_SIGNATURE:
-            raise ValueError("不是有效的 BGI ARC 文件")
+    index_offset = 0x10
+    data_base = index_offset + count * INDEX_ENTRY_SIZE
 
-        count = read_u32(f)
+    entries = []
 
-        index_offset = 0x10
-        data_base = index_offset + count * INDEX_ENTRY_SIZE
+    for i in range(count):
+        pos = index_offset + i * INDEX_ENTRY_SIZE
+        name = bytes(buf[pos:pos + 0x10]).split(b"\x00", 1)[
+            0].decode("ascii")
+        offset, size = struct.unpack_from("<II", buf, pos + 0x10)
+        # 后 8 字节保留
 
-        entries = []
+        entries.append((name, offset, size))
+
+    return data_base, entries
 
-        f.seek(index_offset)
-        for _ in range(count):
-            name = f.read(0x10).split(b"\x00", 1)[
-                0].decode("ascii")
-            offset = read_u32(f)
-            size = read_u32(f)
-            f.read(8)  # reserved
 
-            entries.append((name, offset, size))
+class ArcReader:
+    """
+    以 mmap 方式读取 ARC，条目数据以 memoryview 切片返回，不产生中间拷贝
 
-        for name, offset, size in entries:
-            f.seek(data_base + offset)
-            data = f.read(size)
+    用法:
+        with ArcReader("nrarc02.arc") as reader:
+            data = reader.open("00_001_0")
+    """
 
-            out_path = out_dir / name
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            out_path.write_bytes(dsc_decompress(data))
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._mm)
+        self.data_base, self.entries = parse_index(self._view)
+        self._by_name = {name: (offset, size)
+                         for name, offset, size in self.entries}
 
+    def names(self):
+        return [name for name, _, _ in self.entries]
+
+    def view(self, offset: int, size: int) -> memoryview:
+        """返回数据区 [offset, offset + size) 的零拷贝切片"""
+        start = self.data_base + offset
+        return self._view[start:start + size]
+
+    def raw(self, name: str) -> memoryview:
+        """返回条目压缩数据的零拷贝切片"""
+        if name not in self._by_name:
+            raise KeyError(f"ARC 中不存在条目: {name}")
+        return self.view(*self._by_name[name])
+
+    def open(self, name: str, decoder: str = "table") -> bytes:
+        """按需解压单个条目"""
+        with self.raw(name) as data:
+            return decode_entry(data, decoder)
+
+    def close(self):
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def unpack_entry(reader: ArcReader, out_dir: Path, name: str, offset: int,
+                 size: int, decoder: str = "table") -> Tuple[str, int]:
+    """解压单个条目并写出"""
+    with reader.view(offset, size) as data:
+        out = decode_entry(data, decoder)
+
+    out_path = out_dir / name
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_bytes(out)
+    return name, size
+
+
+# 子进程各自持有一个 ArcReader，避免每个条目重复 mmap 和解析索引
+_worker_reader = None
+
+
+def _init_unpack_worker(input_path: Path):
+    global _worker_reader
+    _worker_reader = ArcReader(input_path)
+
+
+def _unpack_entry_in_worker(out_dir: Path, name: str, offset: int,
+                            size: int, decoder: str) -> Tuple[str, int]:
+    return unpack_entry(_worker_reader, out_dir, name, offset, size, decoder)
+
+
+def unpack(input_path: Path, out_dir: Path, decoder: str = "table", jobs: int = 1):
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with ArcReader(input_path) as reader:
+        entries = reader.entries
+
+        if jobs <= 1:
+            for name, offset, size in entries:
+                unpack_entry(reader, out_dir, name, offset, size, decoder)
+                print(f"[+] {name} ({size} bytes)")
+            return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_unpack_worker,
+                             initargs=(input_path,)) as pool:
+        futures = [pool.submit(_unpack_entry_in_worker, out_dir,
+                               name, offset, size, decoder)
+                   for name, offset, size in entries]
+        for fut in as_completed(futures):
+            name, size = fut.result()
             print(f"[+] {name} ({size} bytes)")
 
 
-def pack(input_dir: Path, out_path: Path):
+def verify(input_path: Path) -> bool:
+    """用所有解码器解压每个条目，检查输出是否完全一致"""
+    ok = True
+    with ArcReader(input_path) as reader:
+        for name, offset, size in reader.entries:
+            with reader.view(offset, size) as data:
+                if bytes(data[:len(DSC_SIGNATURE)]) != DSC_SIGNATURE:
+                    continue
+                results = {k: fn(data) for k, fn in DSC_DECODERS.items()}
+            ref = results["tree"]
+            bad = [k for k, v in results.items() if v != ref]
+            if bad:
+                ok = False
+                print(f"[!] {name}: {', '.join(bad)} 与 tree 解码结果不一致")
+
+        count = len(reader.entries)
+
+    print(f"[+] 校验{'通过' if ok else '失败'}: {count} 个条目")
+    return ok
+
+
+def write_index(f, entries):
+    """回写索引区，entries 为 [(name, offset, size), ...]"""
+    f.seek(0x10)
+    for name, offset, size in entries:
+        name_bytes = name.encode("ascii")[:0x0F]
+        name_bytes += b"\x00" * (0x10 - len(name_bytes))
+
+        f.write(name_bytes)
+        write_u32(f, offset)
+        write_u32(f, size)
+        f.write(b"\x00" * 8)
+
+
+# ----------------- 增量打包 -----------------
+
+MANIFEST_VERSION = 1
+# 数据区中空洞超过有效数据的该比例时，放弃增量打包
+MANIFEST_MAX_WASTE = 0.5
+
+
+def load_manifest(path: Path):
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(path: Path, manifest: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def pack_incremental(files, out_path: Path, compress: bool, level: int,
+                     manifest_path: Path) -> bool:
+    """
+    根据 manifest 只重写内容变化的条目，返回 False 表示需要完整打包
+
+    manifest 记录每个条目输入内容的 hash、在数据区中的偏移、大小和槽位容量。
+    变化的条目若能放进原槽位则原地覆盖，否则追加到数据区末尾，最后只回写索引区。
+    """
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        print("[*] 没有可用的 manifest，执行完整打包")
+        return False
+
+    if (manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("compress") != compress
+            or (compress and manifest.get("level") != level)):
+        print("[*] manifest 与当前打包参数不一致，执行完整打包")
+        return False
+
+    if not out_path.exists() or out_path.stat().st_size != manifest["arc_size"]:
+        print("[*] 封包与 manifest 不一致，执行完整打包")
+        return False
+
+    entries = manifest["entries"]
+    if [e["name"] for e in entries] != [p.name for p in files]:
+        print("[*] 条目列表发生变化，执行完整打包")
+        return False
+
+    data_base = 0x10 + len(files) * INDEX_ENTRY_SIZE
+    end = manifest["arc_size"] - data_base
+    live = sum(e["size"] for e in entries)
+    if end - live > live * MANIFEST_MAX_WASTE:
+        print("[*] 数据区空洞过多，执行完整打包")
+        return False
+
+    # 中途失败时 manifest 已不存在，下次会自动回退到完整打包
+    manifest_path.unlink()
+
+    changed = 0
+    with out_path.open("r+b") as f:
+        for p, e in zip(files, entries):
+            data = p.read_bytes()
+            digest = hashlib.sha1(data).hexdigest()
+            if digest == e["hash"]:
+                continue
+
+            if compress:
+                data = dsc_compress(data, level)
+
+            if len(data) > e["capacity"]:
+                e["offset"] = end
+                e["capacity"] = len(data)
+                end += len(data)
+
+            f.seek(data_base + e["offset"])
+            f.write(data)
+            e["size"] = len(data)
+            e["hash"] = digest
+            changed += 1
+            print(f"[+] 更新 {p.name} ({len(data)} bytes)")
+
+        if changed:
+            write_index(f, [(e["name"], e["offset"], e["size"])
+                            for e in entries])
+
+    manifest["arc_size"] = data_base + end
+    save_manifest(manifest_path, manifest)
+
+    print(f"[+] 增量打包完成: {out_path} (更新 {changed}/{len(files)} 个条目)")
+    return True
+
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def copy_member(src, dst, with_hash: bool = False) -> Tuple[int, Optional[str]]:
+    """
+    把 src 的内容分块写入 dst 的当前位置，返回 (写入字节数, sha1)
+    不需要 hash 时交给 shutil.copyfileobj
+    """
+    if not with_hash:
+        start = dst.tell()
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return dst.tell() - start, None
+
+    hasher = hashlib.sha1()
+    size = 0
+    while True:
+        chunk = src.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        dst.write(chunk)
+        size += len(chunk)
+    return size, hasher.hexdigest()
+
+
+def pack(input_dir: Path, out_path: Path, compress: bool = False,
+         level: int = DSC_DEFAULT_LEVEL, manifest_path: Optional[Path] = None):
     files = sorted(p for p in input_dir.iterdir() if p.is_file())
     count = len(files)
 
+    if manifest_path is not None and pack_incremental(
+            files, out_path, compress, level, manifest_path):
+        return
+
+    raw_size = 0
+    start = time.perf_counter()
+
     with out_path.open("wb") as f:
         # header
         f.write(ARC_SIGNATURE)
@@ -209,33 +883,98 @@ def pack(input_dir: Path, out_path: Path):
         # 先占位索引区
         f.seek(data_base)
 
-        file_datas = []
-        for p in files:
-            data = p.read_bytes()
-            file_datas.append((p.name, data))
-
-        offsets = []
+        # 逐个写入条目数据，同一时刻最多只持有一个条目
+        entries = []
+        hashes = []
         cur_offset = 0
-        for _, data in file_datas:
-            offsets.append(cur_offset)
-            cur_offset += len(data)
-
-        # 写文件数据
-        for _, data in file_datas:
-            f.write(data)
+        for p in files:
+            if compress:
+                data = p.read_bytes()
+                raw_size += len(data)
+                hashes.append(hashlib.sha1(data).hexdigest())
+                data = dsc_compress(data, level)
+                f.write(data)
+                size = len(data)
+            else:
+                with p.open("rb") as src:
+                    size, digest = copy_member(
+                        src, f, with_hash=manifest_path is not None)
+                raw_size += size
+                hashes.append(digest)
+
+            entries.append((p.name, cur_offset, size))
+            cur_offset += size
 
         # 回写索引
-        f.seek(index_offset)
-        for (name, data), offset in zip(file_datas, offsets):
-            name_bytes = name.encode("ascii")[:0x0F]
-            name_bytes += b"\x00" * (0x10 - len(name_bytes))
+        write_index(f, entries)
+
+    if manifest_path is not None:
+        save_manifest(manifest_path, {
+            "version": MANIFEST_VERSION,
+            "compress": compress,
+            "level": level,
+            "arc_size": data_base + cur_offset,
+            "entries": [
+                {"name": name, "hash": digest, "offset": offset,
+                 "size": size, "capacity": size}
+                for (name, offset, size), digest in zip(entries, hashes)
+            ],
+        })
+
+    if compress:
+        elapsed = time.perf_counter() - start
+        ratio = cur_offset / raw_size if raw_size else 1.0
+        speed = raw_size / elapsed / 1024 / 1024 if elapsed else 0.0
+        print(f"[+] 压缩: {raw_size} -> {cur_offset} bytes "
+              f"(压缩率 {ratio:.2%}, {speed:.2f} MiB/s)")
+    print(f"[+] 打包完成: {out_path}")
 
-            f.write(name_bytes)
-            write_u32(f, offset)
-            write_u32(f, len(data))
-            f.write(b"\x00" * 8)
 
-    print(f"[+] 打包完成: {out_path}")
+def roundtrip(input_dir: Path, level: int = DSC_DEFAULT_LEVEL) -> bool:
+    """在临时目录中 pack --compress 后再 unpack，检查解出的文件与 input_dir 完全一致"""
+    files = sorted(p for p in input_dir.iterdir() if p.is_file())
+    with tempfile.TemporaryDirectory() as tmp:
+        arc_path = Path(tmp) / "roundtrip.arc"
+        out_dir = Path(tmp) / "unpacked"
+        pack(input_dir, arc_path, compress=True, level=level)
+        unpack(arc_path, out_dir)
+
+        unpacked = sorted(p.name for p in out_dir.iterdir() if p.is_file())
+        ok = unpacked == [p.name for p in files]
+        if not ok:
+            print(f"[!] 解包得到的文件与输入不一致: {len(unpacked)} / {len(files)}")
+        for p in files:
+            out = out_dir / p.name
+            if out.is_file() and out.read_bytes() != p.read_bytes():
+                ok = False
+                print(f"[!] {p.name}: 解包结果与原文件不一致")
+
+    print(f"[+] 往返校验{'通过' if ok else '失败'}: {len(files)} 个文件 (压缩等级 {level})")
+    return ok
+
+
+def bench(input_dir: Path, levels):
+    """在 input_dir 的全部文件上对比各压缩等级的速度和压缩率"""
+    datas = [p.read_bytes()
+             for p in sorted(input_dir.iterdir()) if p.is_file()]
+    raw_size = sum(len(d) for d in datas)
+    print(f"[+] {len(datas)} 个文件, 共 {raw_size} bytes")
+    print(f"{'level':>5} {'size':>10} {'ratio':>8} {'time':>8} {'MiB/s':>7}")
+
+    for level in levels:
+        out_size = 0
+        elapsed = 0.0
+        for data in datas:
+            start = time.perf_counter()
+            packed = dsc_compress(data, level)
+            elapsed += time.perf_counter() - start
+            if dsc_decompress(packed) != data:
+                raise ValueError(f"等级 {level} 压缩结果无法还原")
+            out_size += len(packed)
+
+        ratio = out_size / raw_size if raw_size else 1.0
+        speed = raw_size / elapsed / 1024 / 1024 if elapsed else 0.0
+        print(f"{level:>5} {out_size:>10} {ratio:>8.2%} {elapsed:>7.2f}s {speed:>7.2f}")
 
 
 def main():
@@ -245,17 +984,49 @@ def main():
     ap_unpack = sub.add_parser('unpack', help='解包')
     ap_unpack.add_argument('-i', '--input', required=True)
     ap_unpack.add_argument('-o', '--out', required=True)
+    ap_unpack.add_argument('--decoder', choices=list(DSC_DECODERS),
+                           default='table', help='DSC 解码器 (默认: table)')
+    ap_unpack.add_argument('-j', '--jobs', type=int, default=1,
+                           help='并行解压的进程数 (默认: 1)')
+
+    ap_verify = sub.add_parser('verify', help='对比各解码器的解压结果')
+    ap_verify.add_argument('-i', '--input', required=True)
 
     ap_pack = sub.add_parser('pack', help='打包')
     ap_pack.add_argument('-i', '--input', required=True)
     ap_pack.add_argument('-o', '--out', required=True)
+    ap_pack.add_argument('--compress', action='store_true',
+                         help='以 DSC 格式压缩条目')
+    ap_pack.add_argument('--level', type=int, choices=list(DSC_LEVELS),
+                         default=DSC_DEFAULT_LEVEL,
+                         help=f'压缩等级 (默认: {DSC_DEFAULT_LEVEL})')
+    ap_pack.add_argument('--manifest', default=None,
+                         help='增量打包使用的 manifest 路径，指定后只重写变化的条目')
+
+    ap_roundtrip = sub.add_parser('roundtrip', help='压缩打包后解包，检查文件是否完全一致')
+    ap_roundtrip.add_argument('-i', '--input', required=True)
+    ap_roundtrip.add_argument('--level', type=int, choices=list(DSC_LEVELS),
+                              default=DSC_DEFAULT_LEVEL,
+                              help=f'压缩等级 (默认: {DSC_DEFAULT_LEVEL})')
+
+    ap_bench = sub.add_parser('bench', help='对比各压缩等级的速度和压缩率')
+    ap_bench.add_argument('-i', '--input', required=True)
+    ap_bench.add_argument('--levels', default='1,3,6,9',
+                          help='逗号分隔的压缩等级列表 (默认: 1,3,6,9)')
 
     args = ap.parse_args()
 
     if args.cmd == 'unpack':
-        unpack(Path(args.input), Path(args.out))
+        unpack(Path(args.input), Path(args.out), args.decoder, args.jobs)
+    elif args.cmd == 'verify':
+        sys.exit(0 if verify(Path(args.input)) else 1)
+    elif args.cmd == 'roundtrip':
+        sys.exit(0 if roundtrip(Path(args.input), args.level) else 1)
+    elif args.cmd == 'bench':
+        bench(Path(args.input), [int(v) for v in args.levels.split(',')])
     else:
-        pack(Path(args.input), Path(args.out))
+        pack(Path(args.input), Path(args.out), args.compress, args.level,
+             Path(args.manifest) if args.manifest else None)
 
 
 if __name__ == '__main__':
@@ -2,8 +2,13 @@
 
 import os
 from pathlib import Path
+from utils_tools import json_check, json_processor, replacement_tool
 from utils_tools.libs import translate_lib
 
+import er
+import ops
+import packer
+
 
 config = {
     "FONT_FACE": "SimHei",  # (ＭＳ ゴシック, SimHei, SimSun)
@@ -37,51 +42,58 @@ PACKER = "python packer.py"
 ASMER = "python ops.py"
 
 ER = [
-    ("python er.py extract --path raw --output raw.json",
-     "python er.py replace --path raw --text generated/translated.json")
+    ("python er.py extract --path raw --output raw.json --slices raw.slices.json",
+     "python er.py replace --path raw --text generated/translated.json --slices raw.slices.json --cache generated/er_replace_cache.json")
 ]
 
+# 进程内模式下与 ER 一一对应的 (提取, 替换) 函数
+ER_FUNCS = [
+    (lambda: er.extract_strings("raw", None, "raw.slices.json"),
+     lambda text: er.replace_text("raw", text, "translated", "raw.slices.json",
+                                  "generated/er_replace_cache.json"))
+]
 
-def extract():
-    print("执行提取...")
-    translate_lib.system(
-        f"{PACKER} unpack -i nrarc02.arc -o asmed")
-    translate_lib.system(
-        f"{ASMER} disasm asmed raw")
-    translate_lib.extract_and_concat(ER)
-    translate_lib.json_process('e', 'raw.json')
-
-
-def replace():
-    print("执行替换...")
-    Path("generated/dist").mkdir(parents=True, exist_ok=True)
 
-    # 你的 replace 逻辑
+def extract(subprocess_mode=False):
+    print("执行提取...")
+    pipeline = translate_lib.Pipeline()
+
+    if subprocess_mode:
+        with pipeline.stage("解包"):
+            translate_lib.system(
+                f"{PACKER} unpack -i nrarc02.arc -o asmed")
+        with pipeline.stage("反汇编"):
+            translate_lib.system(
+                f"{ASMER} disasm asmed raw --cache generated/raw.ops_cache.json")
+        with pipeline.stage("提取文本"):
+            translate_lib.extract_and_concat(ER)
+        with pipeline.stage("处理JSON"):
+            translate_lib.json_process('e', 'raw.json')
+    else:
+        with pipeline.stage("解包"):
+            packer.unpack(Path("nrarc02.arc"), Path("asmed"))
+        with pipeline.stage("反汇编"):
+            ops.disasm_mode("asmed", "raw",
+                            cache_path="generated/raw.ops_cache.json")
+        with pipeline.stage("提取文本"):
+            raw = translate_lib.extract_and_concat_data([e for e, _ in ER_FUNCS])
+        with pipeline.stage("处理JSON"):
+            translate_lib.json_process_data('e', raw)
+            translate_lib.save_json(raw, 'raw.json')
+
+    pipeline.report()
+
+
+DLL_FEATURES = "default_impl,text_hook,create_file_redirect,iat_hook"
+DLL_PANIC = "immediate-abort"
+
+
+def write_configs():
     translate_lib.generate_json(config, "config.json")
     translate_lib.generate_json(hook_lists, "hook_lists.json")
-    translate_lib.copy_path(
-        "translated.json", "generated/translated.json", overwrite=True)
-    translate_lib.copy_path(
-        "raw.json", "generated/raw.json", overwrite=True)
-    translate_lib.json_check()
-    translate_lib.json_process('r', 'generated/translated.json')
-    # translate_lib.ascii_to_fullwidth()
-    translate_lib.replace("cp932", False)  # cp932,shift_jis,gbk
 
-    translate_lib.split_and_replace(ER)
-
-    translate_lib.copy_path(
-        "translated", "generated/translated", overwrite=True)
-
-    translate_lib.system(
-        f"{ASMER} asm generated/translated generated/asmed")
-
-    translate_lib.system(
-        f"{PACKER} pack -i generated/asmed -o generated/dist/NurseryRhyme_chs.arc")
-
-    translate_lib.merge_directories(
-        "assets/dist_pass", "generated/dist", overwrite=True)
 
+def build_dll():
     # patch,custom_font,debug_output,debug_text_mapping
     # default_impl,enum_font_families
     # export_default_dll_main,read_file_patch_impl
@@ -90,11 +102,133 @@ def replace():
     # x64dbg_1337_patch,apply_1337_patch_on_attach,create_file_redirect
     # text_out_arg_c_is_bytes
     translate_lib.TextHookBuilder(
-        os.environ["TEXT_HOOK_PROJECT_PATH"]).build("default_impl,text_hook,create_file_redirect,iat_hook", panic="immediate-abort")
+        os.environ["TEXT_HOOK_PROJECT_PATH"]).build(DLL_FEATURES, panic=DLL_PANIC)
+
+
+def replace_with_subprocess():
+    """兼容模式：按固定顺序执行全部阶段，每个工具在单独的进程中运行"""
+    pipeline = translate_lib.Pipeline()
+
+    with pipeline.stage("生成配置"):
+        write_configs()
+    with pipeline.stage("复制译文"):
+        translate_lib.copy_path(
+            "translated.json", "generated/translated.json", sync=True)
+        translate_lib.copy_path(
+            "raw.json", "generated/raw.json", sync=True)
+    with pipeline.stage("JSON检查"):
+        translate_lib.json_check()
+    with pipeline.stage("处理JSON"):
+        translate_lib.json_process('r', 'generated/translated.json')
+        # translate_lib.ascii_to_fullwidth()
+    with pipeline.stage("字符替换"):
+        translate_lib.replace("cp932", False)  # cp932,shift_jis,gbk
+    with pipeline.stage("替换文本"):
+        translate_lib.split_and_replace(ER)
+    with pipeline.stage("复制脚本"):
+        translate_lib.copy_path(
+            "translated", "generated/translated", sync=True)
+    with pipeline.stage("汇编"):
+        translate_lib.system(
+            f"{ASMER} asm generated/translated generated/asmed --cache generated/asmed.ops_cache.json")
+    with pipeline.stage("打包"):
+        translate_lib.system(
+            f"{PACKER} pack -i generated/asmed -o generated/dist/NurseryRhyme_chs.arc --manifest generated/NurseryRhyme_chs.arc.manifest.json")
+    with pipeline.stage("合并资源"):
+        translate_lib.merge_directories(
+            "assets/dist_pass", "generated/dist", sync=True)
+    with pipeline.stage("构建DLL"):
+        build_dll()
+
+    pipeline.report()
+
+
+def replace_graph() -> translate_lib.BuildGraph:
+    """
+    替换流程的构建图：输入未变化的阶段会被跳过，互不依赖的阶段并发执行。
+    删除 generated/build_state.json 可强制完整构建。
+    """
+    graph = translate_lib.BuildGraph("generated/build_state.json")
+    # 各阶段代码的源文件（含间接导入的库），任一改动都会使该阶段重新执行
+    sources = translate_lib.module_sources
+
+    def process_translated():
+        # 译文只读取一次，检查之后的处理、字符替换都在内存中完成
+        translated = translate_lib.load_json("translated.json")
+        translate_lib.json_process_data('r', translated)
+        # translate_lib.ascii_to_fullwidth()
+        translate_lib.replace_data(translated, "cp932")  # cp932,shift_jis,gbk
+        translate_lib.save_json(translated, "generated/translated.json")
+
+    def replace_text():
+        translate_lib.split_and_replace_data(
+            [r for _, r in ER_FUNCS], translate_lib.load_json("generated/translated.json"))
+
+    graph.target("生成配置", write_configs,
+                 outputs=["generated/config.json", "generated/hook_lists.json"],
+                 fingerprint=[config, hook_lists])
+    graph.target("复制原文",
+                 lambda: translate_lib.copy_path(
+                     "raw.json", "generated/raw.json", sync=True),
+                 inputs=["raw.json"], outputs=["generated/raw.json"])
+    graph.target("JSON检查",
+                 lambda: translate_lib.json_check_data(
+                     translate_lib.load_json("raw.json"), translate_lib.load_json("translated.json")),
+                 inputs=["raw.json", "translated.json", "项目GPT字典.txt", "name替换表.csv"]
+                 + sources(translate_lib, json_check))
+    graph.target("处理译文", process_translated,
+                 inputs=["translated.json"]
+                 + sources(translate_lib, json_processor, replacement_tool),
+                 outputs=["generated/translated.json", "generated/mapping.json",
+                          "generated/replacement_pool.json"],
+                 fingerprint="cp932", after=["JSON检查"])
+    graph.target("替换文本", replace_text,
+                 inputs=["generated/translated.json", "splits.json", "raw.slices.json", "raw"]
+                 + sources(translate_lib, er),
+                 outputs=["translated"])
+    graph.target("复制脚本",
+                 lambda: translate_lib.copy_path(
+                     "translated", "generated/translated", sync=True),
+                 inputs=["translated"], outputs=["generated/translated"])
+    graph.target("汇编",
+                 lambda: ops.asm_mode("generated/translated", "generated/asmed",
+                                      cache_path="generated/asmed.ops_cache.json"),
+                 inputs=["generated/translated"] + sources(ops),
+                 outputs=["generated/asmed"])
+    graph.target("打包",
+                 lambda: packer.pack(Path("generated/asmed"), Path("generated/dist/NurseryRhyme_chs.arc"),
+                                     manifest_path=Path("generated/NurseryRhyme_chs.arc.manifest.json")),
+                 inputs=["generated/asmed"] + sources(packer),
+                 outputs=["generated/dist/NurseryRhyme_chs.arc"])
+
+    dist_pass = Path("assets/dist_pass")
+    graph.target("合并资源",
+                 lambda: translate_lib.merge_directories(
+                     "assets/dist_pass", "generated/dist", sync=True),
+                 inputs=[dist_pass],
+                 outputs=[Path("generated/dist") / f.relative_to(dist_pass)
+                          for f in dist_pass.rglob("*") if f.is_file()])
+
+    builder = translate_lib.TextHookBuilder(
+        os.environ.get("TEXT_HOOK_PROJECT_PATH", ""))
+    # 输入还包括 text_hook 项目的源码，是否调用 cargo 由 TextHookBuilder.build 的指纹判断
+    graph.target("构建DLL", build_dll,
+                 inputs=builder.input_paths(), outputs=[builder.dll_path()], always=True)
+    return graph
+
+
+def replace(subprocess_mode=False):
+    print("执行替换...")
+    Path("generated/dist").mkdir(parents=True, exist_ok=True)
+
+    if subprocess_mode:
+        replace_with_subprocess()
+    else:
+        replace_graph().run()
 
 
 def main():
-    translate_lib.create_cli(extract, replace)()
+    translate_lib.create_cli(extract, replace, subprocess_option=True)()
 
 
 if __name__ == "__main__":
@@ -1,26 +1,177 @@
 #!/usr/bin/env python3
 
+import argparse
+import bisect
+from concurrent.futures import ProcessPoolExecutor
+import csv
 import json
+import os
 import re
 import sys
+import unicodedata
 from typing import Dict, List, Any, Callable, Tuple
 
+try:
+    from utils_tools.libs.ac_lib import AhoCorasick
+except ImportError:  # 直接运行 python utils_tools/json_check.py 时
+    from libs.ac_lib import AhoCorasick
+
+
+# 字符类别：用于一次扫描对消息中的字符分类，(起始码点, 结束码点) 均包含
+CHAR_CLASSES: Dict[str, List[Tuple[int, int]]] = {
+    # 韩文字母和音节
+    'korean': [(0x3131, 0x314E), (0x314F, 0x3163), (0xAC00, 0xD7A3)],
+    # 日语平假名：U+3040-U+309F
+    'hiragana': [(0x3040, 0x309F)],
+    # 日语片假名：U+30A0-U+30FF
+    'katakana': [(0x30A0, 0x30FF)],
+    # 不可见字符（包括零宽度空格、连接符、格式控制符等）
+    'invisible': [(0x200B, 0x200F), (0x2060, 0x2064), (0x206A, 0x206F),
+                  (0xFEFF, 0xFEFF), (0x202A, 0x202E), (0x180E, 0x180E)],
+    # 引号
+    'quote': [(ord(c), ord(c)) for c in '「」『』“”‘’'],
+}
+
+
+def rule(*char_classes: str, hits: Callable[[str], bool] | None = None,
+         min_len: str | None = None, summary: str | None = None, warning: bool = False):
+    """
+    声明逐条目检查规则
+
+    参数:
+        char_classes: 规则关心的字符类别（见 CHAR_CLASSES）。非空时只有 message 或 name
+                      中出现其中任一类别的字符，规则才会被调用；为空则每个条目都调用
+        hits: 可选的预筛选，参数为 message 中关心的字符（按出现顺序拼接），返回 False
+              时不调用规则。结果按字符串缓存，相同的字符组合只计算一次
+        min_len: 可选的检查器属性名，只有 message 长度超过该属性的值时才调用规则
+        summary: 可选的检查器方法名。声明后规则多接收一个 tally 字典（键 -> 条目索引列表），
+                 全部条目检查完后以合并的 tally 调用该方法，返回的汇总行追加在规则输出之后
+        warning: 为 True 时规则的输出作为警告单独列出，不影响检查是否通过
+    """
+    def wrap(func):
+        func.char_classes = frozenset(char_classes)
+        func.hits_filter = hits
+        func.min_len = min_len
+        func.summary = summary
+        func.warning = warning
+        return func
+    return wrap
+
+
+def _quotes_unbalanced(hits: str) -> bool:
+    """引号序列是否未完全配对（相邻的配对引号反复消去后仍有剩余）"""
+    quotes = ''.join(c for c in hits if c in JSONChecker.open_to_close
+                     or c in JSONChecker.close_to_open)
+    while quotes:
+        reduced = quotes
+        for open_char, close_char in JSONChecker.open_to_close.items():
+            reduced = reduced.replace(open_char + close_char, '')
+        if reduced == quotes:
+            return True
+        quotes = reduced
+    return False
+
+
+def _has_doubled_quote(hits: str) -> bool:
+    """message 中含有「「等重复引号时，关心的字符中也必然相邻出现"""
+    return any(quote in hits for quote in ('「「', '」」', '『『', '』』'))
+
+
+def _is_katakana(ch: str) -> bool:
+    """片假名（含长音符，不含用于分隔人名的中点・）"""
+    return '\u30a0' <= ch <= '\u30ff' and ch != '・'
+
+
+class Entry:
+    """
+    单个条目在一次遍历中的共享数据
+
+    chars / name_chars 为 message / name 中按类别分组的字符（按出现顺序），
+    只包含启用的规则关心的类别，未出现的类别不在字典中
+    """
+    __slots__ = ('index', 'orig', 'tran', 'chars', 'name_chars')
+
+    def __init__(self, index: int, orig: Dict | None, tran: Dict,
+                 chars: Dict[str, List[str]], name_chars: Dict[str, List[str]]):
+        self.index = index
+        self.orig = orig  # 原文条目，原文条目数不足时为 None
+        self.tran = tran
+        self.chars = chars
+        self.name_chars = name_chars
+
+
+class CharClassifier:
+    """
+    把若干字符类别合并为一个正则，得到文本中所有关心的字符及其类别
+
+    scan 把所有文本用分隔符拼接后只做一次 findall（分隔符也在字符集中），
+    再按分隔符切开，得到每个文本中关心的字符串，全部在 C 层完成
+    """
+
+    SEP = '\x00'
+
+    def __init__(self, classes):
+        self.ranges = [(lo, hi, name) for name in classes for lo, hi in CHAR_CLASSES[name]]
+        parts = [re.escape(chr(lo)) if lo == hi else f"{re.escape(chr(lo))}-{re.escape(chr(hi))}"
+                 for lo, hi, _ in self.ranges]
+        self.pattern = re.compile(f"[{''.join(parts)}]") if parts else None
+        self.scan_pattern = re.compile(
+            f"[{re.escape(self.SEP)}{''.join(parts)}]") if parts else None
+        self._group_cache: Dict[str, Dict[str, List[str]]] = {}
+
+    def scan(self, texts: List[str]) -> List[str]:
+        """返回每个文本中关心的字符（按出现顺序拼接）"""
+        if self.pattern is None:
+            return [''] * len(texts)
+        joined = self.SEP.join(texts)
+        if joined.count(self.SEP) != len(texts) - 1:
+            # 文本本身含有分隔符，逐个扫描
+            return [''.join(self.pattern.findall(t)) for t in texts]
+        return ''.join(self.scan_pattern.findall(joined)).split(self.SEP)
+
+    def group(self, hits: str) -> Dict[str, List[str]]:
+        """把 scan 的结果按类别分组，结果会被缓存共享，调用方不能修改"""
+        groups = self._group_cache.get(hits)
+        if groups is None:
+            groups = {}
+            for char in hits:
+                code = ord(char)
+                name = next(n for lo, hi, n in self.ranges if lo <= code <= hi)
+                groups.setdefault(name, []).append(char)
+            self._group_cache[hits] = groups
+        return groups
+
 
 class JSONChecker:
+    # 引号配对规则
+    open_to_close = {
+        '「': '」',
+        '『': '』',
+        '“': '”',
+        '‘': '’',
+    }
+    close_to_open = {v: k for k, v in open_to_close.items()}
+
     def __init__(self, original_json: List[Dict], translated_json: List[Dict]):
         self.original = original_json
         self.translated = translated_json
         self.errors = []
+        self.warnings = []
+        self._matchers: Dict[Tuple[str, ...], AhoCorasick] = {}
 
-        # 字符正则表达式
-        self.korean_pattern = re.compile(r'[ㄱ-ㅎㅏ-ㅣ가-힣]')
-        # 日语平假名：U+3040-U+309F
-        self.hiragana_pattern = re.compile(r'[\u3040-\u309F]')
-        # 日语片假名：U+30A0-U+30FF
-        self.katakana_pattern = re.compile(r'[\u30A0-\u30FF]')
         # 定义要检查的特殊字符
         self.special_chars = ['@p', '@k', '@r', '@P', '@K', '@R']
 
+        # 术语表（日文[Tab]中文[Tab]解释）和人名替换表（JP_Name,CN_Name,Count），不存在时忽略
+        self.glossary_file = '项目GPT字典.txt'
+        self.name_table_file = 'name替换表.csv'
+        self._glossary: Dict[str, str] | None = None
+        self._glossary_terms: List[str] = []
+        self._glossary_matcher: AhoCorasick | None = None
+        self._glossary_name_hits: Dict[str, List[int]] = {}
+        # 术语汇总中每个术语最多列出的条目索引数
+        self.glossary_max_indices = 10
+
         # 定义禁用词列表
         self.forbidden_words = [
             '学长',  # 统一为前辈
@@ -46,11 +197,10 @@ class JSONChecker:
         self.max_select_text_len = 25
         # 标题字符最大长度，超出这个长度，游戏会有问题
         self.max_title_text_len = 18
-
-        # 不可见字符正则表达式（包括零宽度空格、连接符、格式控制符等）
-        self.invisible_pattern = re.compile(
-            r'[\u200B-\u200F\u2060-\u2064\u206A-\u206F\uFEFF\u202A-\u202E\u180E\u2063]'
-        )
+        # 消息长度不超过此值时不可能触发任何长度限制，check_max_text_len 不会被调用
+        self.min_text_len_limit = min(self.max_text_len,
+                                      len("[select]") + self.max_select_text_len,
+                                      len("[title]") + self.max_title_text_len)
 
         # 不可见字符映射表，用于显示字符名称
         self.invisible_char_names = {
@@ -75,7 +225,7 @@ class JSONChecker:
             '\u180E': 'U+180E(蒙古文元音分隔符)',
         }
 
-        # 注册所有检查方法
+        # 注册所有检查规则，报告按此顺序分组输出
         self.checks = [
             # self.check_special_characters,
             self.check_korean_characters,
@@ -87,498 +237,698 @@ class JSONChecker:
             # self.check_forbidden_words,
             self.check_unpaired_quotes,  # 新增：检查未配对的引号
             self.check_max_text_len,
+            self.check_glossary,  # 术语一致性，只作为警告
         ]
 
-    def check_max_text_len(self) -> bool:
+    @rule(min_len='min_text_len_limit')
+    def check_max_text_len(self, e: Entry, errors: List[str]) -> bool:
         """检查译文的最大长度"""
         success = True
+        i = e.index
+        msg = e.tran['message']
 
-        for i, tran in enumerate(self.translated):
-            msg = tran['message']
-
-            if msg.startswith("[title]") and len(msg[7:]) > self.max_title_text_len:
-                self.errors.append(
-                    f"索引 {i} message字段超长 {msg } ({len(msg[7:])} > {self.max_title_text_len})"
-                )
-                success = False
+        if msg.startswith("[title]") and len(msg[7:]) > self.max_title_text_len:
+            errors.append(
+                f"索引 {i} message字段超长 {msg } ({len(msg[7:])} > {self.max_title_text_len})"
+            )
+            success = False
 
-            if msg.startswith("[select]") and len(msg[8:]) > self.max_select_text_len:
-                self.errors.append(
-                    f"索引 {i} message字段超长 {msg } ({len(msg[8:])} > {self.max_select_text_len})"
-                )
-                success = False
+        if msg.startswith("[select]") and len(msg[8:]) > self.max_select_text_len:
+            errors.append(
+                f"索引 {i} message字段超长 {msg } ({len(msg[8:])} > {self.max_select_text_len})"
+            )
+            success = False
 
-            if len(msg) > self.max_text_len:
-                self.errors.append(
-                    f"索引 {i} message字段超长 {msg } ({len(msg)} > {self.max_text_len})"
-                )
-                success = False
+        if len(msg) > self.max_text_len:
+            errors.append(
+                f"索引 {i} message字段超长 {msg } ({len(msg)} > {self.max_text_len})"
+            )
+            success = False
 
         return success
 
-    def check_unpaired_quotes(self) -> bool:
+    @rule('quote', hits=_quotes_unbalanced)
+    def check_unpaired_quotes(self, e: Entry, errors: List[str]) -> bool:
         """检查译文中是否有未配对的「」、『』、以及“”"""
-        success = True
+        if 'message' not in e.tran:
+            return True
 
-        # 配对规则
-        open_to_close = {
-            '「': '」',
-            '『': '』',
-            '“': '”',
-            '‘': '’',
-        }
-        close_to_open = {v: k for k, v in open_to_close.items()}
+        open_to_close = self.open_to_close
+        close_to_open = self.close_to_open
 
-        for i, tran in enumerate(self.translated):
-            if 'message' not in tran:
-                continue
+        i = e.index
+        message = e.tran['message']
+        error_details = []
 
-            message = tran['message']
-            has_error = False
-            error_details = []
-
-            stack: list[tuple[str, int]] = []
-
-            # 第一遍：配对检查
-            for pos, char in enumerate(message):
-                # 开引号
-                if char in open_to_close:
-                    stack.append((char, pos))
-
-                # 闭引号
-                elif char in close_to_open:
-                    if stack and stack[-1][0] == close_to_open[char]:
-                        stack.pop()
-                    else:
-                        has_error = True
-                        error_details.append(f"位置 {pos}: 多余的 '{char}'")
-
-            # 剩余未关闭的开引号
-            for quote_char, pos in stack:
-                has_error = True
-                error_details.append(f"位置 {pos}: 未关闭的 '{quote_char}'")
-
-            if not has_error:
-                continue
+        stack: list[tuple[str, int]] = []
 
-            success = False
-            self.errors.append(f"索引 {i} 译文中存在未配对的引号:")
+        # 第一遍：配对检查
+        for pos, char in enumerate(message):
+            # 开引号
+            if char in open_to_close:
+                stack.append((char, pos))
 
-            for detail in error_details:
-                self.errors.append(f"  {detail}")
+            # 闭引号
+            elif char in close_to_open:
+                if stack and stack[-1][0] == close_to_open[char]:
+                    stack.pop()
+                else:
+                    error_details.append(f"位置 {pos}: 多余的 '{char}'")
 
-            # 高亮显示
-            highlighted = list(message)
+        # 剩余未关闭的开引号
+        for quote_char, pos in stack:
+            error_details.append(f"位置 {pos}: 未关闭的 '{quote_char}'")
 
-            # 标记未关闭的开引号
-            for quote_char, pos in stack:
-                highlighted[pos] = f"【{quote_char}】"
+        if not error_details:
+            return True
 
-            # 第二遍：标记多余的闭引号
-            temp_stack = []
-            for pos, char in enumerate(message):
-                if char in open_to_close:
-                    temp_stack.append(char)
-                elif char in close_to_open:
-                    if temp_stack and temp_stack[-1] == close_to_open[char]:
-                        temp_stack.pop()
-                    else:
-                        highlighted[pos] = f"【{char}】"
+        errors.append(f"索引 {i} 译文中存在未配对的引号:")
 
-            highlighted_text = ''.join(highlighted)
+        for detail in error_details:
+            errors.append(f"  {detail}")
 
-            self.errors.append(
-                f"  原文message: {self.original[i].get('message', '无')}"
-            )
-            self.errors.append(f"  译文message: {message}")
-            self.errors.append(f"  高亮显示: {highlighted_text}")
-            self.errors.append("")
+        # 高亮显示
+        highlighted = list(message)
 
-        return success
+        # 标记未关闭的开引号
+        for quote_char, pos in stack:
+            highlighted[pos] = f"【{quote_char}】"
+
+        # 第二遍：标记多余的闭引号
+        temp_stack = []
+        for pos, char in enumerate(message):
+            if char in open_to_close:
+                temp_stack.append(char)
+            elif char in close_to_open:
+                if temp_stack and temp_stack[-1] == close_to_open[char]:
+                    temp_stack.pop()
+                else:
+                    highlighted[pos] = f"【{char}】"
+
+        highlighted_text = ''.join(highlighted)
 
-    def check_forbidden_words(self) -> bool:
+        errors.append(
+            f"  原文message: {self.original[i].get('message', '无')}"
+        )
+        errors.append(f"  译文message: {message}")
+        errors.append(f"  高亮显示: {highlighted_text}")
+        errors.append("")
+
+        return False
+
+    def matcher(self, words: List[str]) -> AhoCorasick:
+        """词表对应的多模式匹配自动机，按词表内容缓存，每个进程只构建一次"""
+        key = tuple(words)
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            matcher = self._matchers[key] = AhoCorasick(key)
+        return matcher
+
+    def find_words(self, words: List[str], text: str) -> List[str]:
+        """text 中出现的词，按词表顺序"""
+        return [words[idx] for idx in sorted(self.matcher(words).found(text))]
+
+    @rule()
+    def check_forbidden_words(self, e: Entry, errors: List[str]) -> bool:
         """检查译文中是否包含禁用词"""
         success = True
+        i, tran = e.index, e.tran
+
+        # 检查message字段
+        if 'message' in tran:
+            message = tran['message']
+            # 一次扫描找出所有禁用词
+            found_words = self.find_words(self.forbidden_words, message)
 
-        for i, tran in enumerate(self.translated):
-            # 检查message字段
-            if 'message' in tran:
-                message = tran['message']
-                found_words = []
-
-                # 检查每个禁用词
-                for word in self.forbidden_words:
-                    if word in message:
-                        found_words.append(word)
-
-                if found_words:
-                    self.errors.append(
-                        f"索引 {i} message字段中包含禁用词: {', '.join(found_words)}"
-                    )
-                    self.errors.append(
-                        f"  原文message: {self.original[i].get('message', '无')}")
-                    self.errors.append(f"  译文message: {message}")
-
-                    # 高亮显示禁用词
-                    highlighted = message
-                    for word in found_words:
-                        highlighted = highlighted.replace(word, f"【{word}】")
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
-
-            # 检查name字段
-            if 'name' in tran:
-                name = tran['name']
-                found_words = []
-
-                # 检查每个禁用词
-                for word in self.forbidden_words:
-                    if word in name:
-                        found_words.append(word)
-
-                if found_words:
-                    self.errors.append(
-                        f"索引 {i} name字段中包含禁用词: {', '.join(found_words)}"
-                    )
-                    self.errors.append(
-                        f"  原文name: {self.original[i].get('name', '无')}")
-                    self.errors.append(f"  译文name: {name}")
-
-                    # 高亮显示禁用词
-                    highlighted = name
-                    for word in found_words:
-                        highlighted = highlighted.replace(word, f"【{word}】")
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
+            if found_words:
+                errors.append(
+                    f"索引 {i} message字段中包含禁用词: {', '.join(found_words)}"
+                )
+                errors.append(
+                    f"  原文message: {self.original[i].get('message', '无')}")
+                errors.append(f"  译文message: {message}")
+
+                # 高亮显示禁用词
+                highlighted = message
+                for word in found_words:
+                    highlighted = highlighted.replace(word, f"【{word}】")
+                errors.append(f"  高亮显示: {highlighted}")
+                errors.append("")
+                success = False
+
+        # 检查name字段
+        if 'name' in tran:
+            name = tran['name']
+            found_words = self.find_words(self.forbidden_words, name)
+
+            if found_words:
+                errors.append(
+                    f"索引 {i} name字段中包含禁用词: {', '.join(found_words)}"
+                )
+                errors.append(
+                    f"  原文name: {self.original[i].get('name', '无')}")
+                errors.append(f"  译文name: {name}")
+
+                # 高亮显示禁用词
+                highlighted = name
+                for word in found_words:
+                    highlighted = highlighted.replace(word, f"【{word}】")
+                errors.append(f"  高亮显示: {highlighted}")
+                errors.append("")
+                success = False
 
         return success
 
-    def check_invisible_characters(self) -> bool:
+    @rule('invisible')
+    def check_invisible_characters(self, e: Entry, errors: List[str]) -> bool:
         """检查译文中是否包含不可见字符"""
         success = True
-        for i, tran in enumerate(self.translated):
-            if 'message' in tran:
-                message = tran['message']
-                invisible_matches = self.invisible_pattern.findall(message)
-
-                if invisible_matches:
-                    # 统计每个不可见字符的出现次数
-                    char_count = {}
-                    for char in invisible_matches:
-                        char_count[char] = char_count.get(char, 0) + 1
-
-                    # 构建错误信息
-                    char_details = []
-                    for char, count in char_count.items():
-                        char_name = self.invisible_char_names.get(
-                            char, f'U+{ord(char):04X}(未知不可见字符)')
-                        char_details.append(f"{char_name}: {count}次")
-
-                    self.errors.append(
-                        f"索引 {i} 译文中包含不可见字符:\n  " +
-                        "\n  ".join(char_details)
-                    )
-                    self.errors.append(f"  译文: {repr(message)}")
-
-                    # 高亮显示不可见字符位置
-                    highlighted = message
-                    for char in char_count.keys():
-                        placeholder = f"【{self.invisible_char_names.get(char, f'U+{ord(char):04X}').split('(')[0]}】"
-                        highlighted = highlighted.replace(char, placeholder)
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
-
-            # 同时也检查name字段
-            if 'name' in tran:
-                name = tran['name']
-                invisible_matches = self.invisible_pattern.findall(name)
-
-                if invisible_matches:
-                    char_count = {}
-                    for char in invisible_matches:
-                        char_count[char] = char_count.get(char, 0) + 1
-
-                    char_details = []
-                    for char, count in char_count.items():
-                        char_name = self.invisible_char_names.get(
-                            char, f'U+{ord(char):04X}(未知不可见字符)')
-                        char_details.append(f"{char_name}: {count}次")
-
-                    self.errors.append(
-                        f"索引 {i} name字段中包含不可见字符:\n  " +
-                        "\n  ".join(char_details)
-                    )
-                    self.errors.append(f"  name: {repr(name)}")
-                    self.errors.append("")
-                    success = False
+        i, tran = e.index, e.tran
+
+        invisible_matches = e.chars.get('invisible')
+        if invisible_matches:
+            message = tran['message']
+
+            # 统计每个不可见字符的出现次数
+            char_count = {}
+            for char in invisible_matches:
+                char_count[char] = char_count.get(char, 0) + 1
+
+            # 构建错误信息
+            char_details = []
+            for char, count in char_count.items():
+                char_name = self.invisible_char_names.get(
+                    char, f'U+{ord(char):04X}(未知不可见字符)')
+                char_details.append(f"{char_name}: {count}次")
+
+            errors.append(
+                f"索引 {i} 译文中包含不可见字符:\n  " +
+                "\n  ".join(char_details)
+            )
+            errors.append(f"  译文: {repr(message)}")
+
+            # 高亮显示不可见字符位置
+            highlighted = message
+            for char in char_count.keys():
+                placeholder = f"【{self.invisible_char_names.get(char, f'U+{ord(char):04X}').split('(')[0]}】"
+                highlighted = highlighted.replace(char, placeholder)
+            errors.append(f"  高亮显示: {highlighted}")
+            errors.append("")
+            success = False
+
+        # 同时也检查name字段
+        invisible_matches = e.name_chars.get('invisible')
+        if invisible_matches:
+            name = tran['name']
+            char_count = {}
+            for char in invisible_matches:
+                char_count[char] = char_count.get(char, 0) + 1
+
+            char_details = []
+            for char, count in char_count.items():
+                char_name = self.invisible_char_names.get(
+                    char, f'U+{ord(char):04X}(未知不可见字符)')
+                char_details.append(f"{char_name}: {count}次")
+
+            errors.append(
+                f"索引 {i} name字段中包含不可见字符:\n  " +
+                "\n  ".join(char_details)
+            )
+            errors.append(f"  name: {repr(name)}")
+            errors.append("")
+            success = False
 
         return success
 
-    def check_quote_consistency(self) -> bool:
+    @rule()
+    def check_quote_consistency(self, e: Entry, errors: List[str]) -> bool:
         """检查开头和结尾的引号是否与原文一致"""
-        success = True
-        for i, (orig, tran) in enumerate(zip(self.original, self.translated)):
-            if 'message' not in orig or 'message' not in tran:
-                continue
+        orig, tran = e.orig, e.tran
+        if orig is None or 'message' not in orig or 'message' not in tran:
+            return True
 
-            o = orig['message'].strip()
-            t = tran['message'].strip()
+        success = True
+        i = e.index
+        o = orig['message'].strip()
+        t = tran['message'].strip()
 
-            if not o or not t:
-                continue
+        if not o or not t:
+            return True
 
-            # 检查开头引号
-            if o[0] in '「『' and o[0] != t[0]:
-                self.errors.append(
-                    f"索引 {i} 开头引号不一致:\n 原文'{o}'\n 译文'{t if t else '无'}'\n")
-                success = False
+        # 检查开头引号
+        if o[0] in '「『' and o[0] != t[0]:
+            errors.append(
+                f"索引 {i} 开头引号不一致:\n 原文'{o}'\n 译文'{t if t else '无'}'\n")
+            success = False
 
-            # 检查结尾引号
-            if o[-1] in '」』' and o[-1] != t[-1]:
-                self.errors.append(
-                    f"索引 {i} 结尾引号不一致:\n 原文'{o}'\n 译文'{t if t else '无'}'\n")
-                success = False
+        # 检查结尾引号
+        if o[-1] in '」』' and o[-1] != t[-1]:
+            errors.append(
+                f"索引 {i} 结尾引号不一致:\n 原文'{o}'\n 译文'{t if t else '无'}'\n")
+            success = False
 
         return success
 
-    def check_korean_characters(self) -> bool:
+    @rule('korean')
+    def check_korean_characters(self, e: Entry, errors: List[str]) -> bool:
         """检查译文中是否包含韩文字符"""
-        success = True
-        for i, tran in enumerate(self.translated):
-            if 'message' in tran:
-                message = tran['message']
-                korean_matches = self.korean_pattern.findall(message)
-
-                if korean_matches:
-                    # 去重并显示找到的韩文字符
-                    unique_chars = list(set(korean_matches))
-                    self.errors.append(
-                        f"索引 {i} 译文中包含韩文字符: {unique_chars}")
-                    self.errors.append(f"  译文: {message}")
-
-                    # 高亮显示韩文字符位置
-                    highlighted = message
-                    for char in unique_chars:
-                        highlighted = highlighted.replace(char, f"【{char}】")
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
+        korean_matches = e.chars.get('korean')
+        if not korean_matches:
+            return True
+
+        i, message = e.index, e.tran['message']
+
+        # 去重（保持出现顺序，输出不受 hash 种子影响）并显示找到的韩文字符
+        unique_chars = list(dict.fromkeys(korean_matches))
+        errors.append(
+            f"索引 {i} 译文中包含韩文字符: {unique_chars}")
+        errors.append(f"  译文: {message}")
+
+        # 高亮显示韩文字符位置
+        highlighted = message
+        for char in unique_chars:
+            highlighted = highlighted.replace(char, f"【{char}】")
+        errors.append(f"  高亮显示: {highlighted}")
+        errors.append("")
+        return False
+
+    @rule('hiragana', 'katakana')
+    def check_japanese_characters(self, e: Entry, errors: List[str]) -> bool:
+        """检查译文中是否包含日语假名字符"""
+        # 检查平假名
+        hiragana_matches = e.chars.get('hiragana', [])
+        # 检查片假名
+        katakana_matches = e.chars.get('katakana', [])
 
-        return success
+        all_japanese_matches = hiragana_matches + katakana_matches
 
-    def check_japanese_characters(self) -> bool:
-        """检查译文中是否包含日语假名字符"""
-        success = True
-        for i, tran in enumerate(self.translated):
-            if 'message' in tran:
-                message = tran['message']
-
-                # 检查平假名
-                hiragana_matches = self.hiragana_pattern.findall(message)
-                # 检查片假名
-                katakana_matches = self.katakana_pattern.findall(message)
-
-                all_japanese_matches = hiragana_matches + katakana_matches
-
-                if all_japanese_matches:
-                    # 去重并分类显示找到的日语字符
-                    unique_hiragana = list(set(hiragana_matches))
-                    unique_katakana = list(set(katakana_matches))
-
-                    error_msg = f"索引 {i} 译文中包含日语假名字符:"
-                    if unique_hiragana:
-                        error_msg += f" 平假名{unique_hiragana}"
-                    if unique_katakana:
-                        error_msg += f" 片假名{unique_katakana}"
-
-                    self.errors.append(error_msg)
-                    self.errors.append(f"  译文: {message}")
-
-                    # 高亮显示日语字符位置
-                    highlighted = message
-                    for char in unique_hiragana + unique_katakana:
-                        highlighted = highlighted.replace(char, f"【{char}】")
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
+        if not all_japanese_matches:
+            return True
 
-        return success
+        i, message = e.index, e.tran['message']
+
+        # 去重（保持出现顺序）并分类显示找到的日语字符
+        unique_hiragana = list(dict.fromkeys(hiragana_matches))
+        unique_katakana = list(dict.fromkeys(katakana_matches))
+
+        error_msg = f"索引 {i} 译文中包含日语假名字符:"
+        if unique_hiragana:
+            error_msg += f" 平假名{unique_hiragana}"
+        if unique_katakana:
+            error_msg += f" 片假名{unique_katakana}"
+
+        errors.append(error_msg)
+        errors.append(f"  译文: {message}")
 
-    def check_duplicate_quotes(self) -> bool:
+        # 高亮显示日语字符位置
+        highlighted = message
+        for char in unique_hiragana + unique_katakana:
+            highlighted = highlighted.replace(char, f"【{char}】")
+        errors.append(f"  高亮显示: {highlighted}")
+        errors.append("")
+        return False
+
+    @rule('quote', hits=_has_doubled_quote)
+    def check_duplicate_quotes(self, e: Entry, errors: List[str]) -> bool:
         """检查译文中是否有重复的「」和『』"""
+        if 'message' not in e.tran:
+            return True
+
         success = True
-        for i, tran in enumerate(self.translated):
-            if 'message' in tran:
-                message = tran['message']
-
-                # 检查重复的「
-                if '「「' in message:
-                    self.errors.append(f"索引 {i} 译文中包含重复的「「")
-                    self.errors.append(f"  译文: {message}")
-
-                    # 高亮显示重复的「
-                    highlighted = message.replace('「「', '【「「】')
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
-
-                # 检查重复的」
-                if '」」' in message:
-                    self.errors.append(f"索引 {i} 译文中包含重复的」」")
-                    self.errors.append(f"  译文: {message}")
-
-                    # 高亮显示重复的」
-                    highlighted = message.replace('」」', '【」」】')
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
-
-                # 检查重复的『
-                if '『『' in message:
-                    self.errors.append(f"索引 {i} 译文中包含重复的『『")
-                    self.errors.append(f"  译文: {message}")
-
-                    # 高亮显示重复的『
-                    highlighted = message.replace('『『', '【『『】')
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
-
-                # 检查重复的』
-                if '』』' in message:
-                    self.errors.append(f"索引 {i} 译文中包含重复的』』")
-                    self.errors.append(f"  译文: {message}")
-
-                    # 高亮显示重复的』
-                    highlighted = message.replace('』』', '【』』】')
-                    self.errors.append(f"  高亮显示: {highlighted}")
-                    self.errors.append("")
-                    success = False
+        i, message = e.index, e.tran['message']
+
+        for quote in ('「「', '」」', '『『', '』』'):
+            if quote in message:
+                errors.append(f"索引 {i} 译文中包含重复的{quote}")
+                errors.append(f"  译文: {message}")
+
+                # 高亮显示重复的引号
+                highlighted = message.replace(quote, f'【{quote}】')
+                errors.append(f"  高亮显示: {highlighted}")
+                errors.append("")
+                success = False
 
         return success
 
-    def check_length_discrepancy(self) -> bool:
+    @rule()
+    def check_length_discrepancy(self, e: Entry, errors: List[str]) -> bool:
         """检查译文和原文的字符数量差是否过大"""
-        success = True
         threshold_ratio = 2.0  # 译文长度不能超过原文长度的2倍
         min_ratio = 0.3  # 译文长度不能少于原文长度的30%
 
-        for i, (orig, tran) in enumerate(zip(self.original, self.translated)):
-            # 只检查message字段
-            if 'message' in orig and 'message' in tran:
-                orig_message = orig['message']
-                tran_message = tran['message']
-
-                orig_len = len(orig_message)
-                tran_len = len(tran_message)
-
-                # 避免除零错误
-                if orig_len > 0:
-                    length_ratio = tran_len / orig_len
-
-                    if length_ratio > threshold_ratio:
-                        self.errors.append(
-                            f"索引 {i} 译文长度过长: "
-                            f"原文长度 {orig_len}，译文长度 {tran_len}，比例 {length_ratio:.2f} (超过阈值 {threshold_ratio})"
-                        )
-                        self.errors.append(f"  原文: {orig_message}")
-                        self.errors.append(f"  译文: {tran_message}")
-                        self.errors.append("")
-                        success = False
-
-                    elif length_ratio < min_ratio:
-                        self.errors.append(
-                            f"索引 {i} 译文长度过短: "
-                            f"原文长度 {orig_len}，译文长度 {tran_len}，比例 {length_ratio:.2f} (低于阈值 {min_ratio})"
-                        )
-                        self.errors.append(f"  原文: {orig_message}")
-                        self.errors.append(f"  译文: {tran_message}")
-                        self.errors.append("")
-                        success = False
+        orig, tran = e.orig, e.tran
+        # 只检查message字段
+        if orig is None or 'message' not in orig or 'message' not in tran:
+            return True
+
+        i = e.index
+        orig_message = orig['message']
+        tran_message = tran['message']
+
+        orig_len = len(orig_message)
+        tran_len = len(tran_message)
+
+        # 避免除零错误
+        if orig_len == 0:
+            return True
+
+        length_ratio = tran_len / orig_len
+
+        if length_ratio > threshold_ratio:
+            errors.append(
+                f"索引 {i} 译文长度过长: "
+                f"原文长度 {orig_len}，译文长度 {tran_len}，比例 {length_ratio:.2f} (超过阈值 {threshold_ratio})"
+            )
+            errors.append(f"  原文: {orig_message}")
+            errors.append(f"  译文: {tran_message}")
+            errors.append("")
+            return False
+
+        if length_ratio < min_ratio:
+            errors.append(
+                f"索引 {i} 译文长度过短: "
+                f"原文长度 {orig_len}，译文长度 {tran_len}，比例 {length_ratio:.2f} (低于阈值 {min_ratio})"
+            )
+            errors.append(f"  原文: {orig_message}")
+            errors.append(f"  译文: {tran_message}")
+            errors.append("")
+            return False
+
+        return True
+
+    def load_glossary(self) -> Dict[str, str]:
+        """读取术语表和人名替换表，返回 日文 -> 中文（同一日文以先出现的为准）"""
+        if self._glossary is not None:
+            return self._glossary
+
+        glossary: Dict[str, str] = {}
+        if os.path.exists(self.glossary_file):
+            with open(self.glossary_file, 'r', encoding='utf-8-sig') as f:
+                for line in f:
+                    line = line.rstrip('\r\n')
+                    # 跳过注释、分组标题和空行
+                    if not line.strip() or line.startswith(('//', '#')):
+                        continue
+                    parts = line.split('\t')
+                    if len(parts) >= 2 and parts[0] and parts[1]:
+                        glossary.setdefault(parts[0], parts[1])
+
+        if os.path.exists(self.name_table_file):
+            with open(self.name_table_file, 'r', encoding='utf-8-sig', newline='') as f:
+                for row in csv.DictReader(f):
+                    jp, cn = row.get('JP_Name'), row.get('CN_Name')
+                    if jp and cn:
+                        glossary.setdefault(jp, cn)
+
+        self._glossary = glossary
+        self._glossary_terms = list(glossary)
+        self._glossary_matcher = self.matcher(self._glossary_terms)
+        return glossary
+
+    def glossary_terms_in(self, text: str) -> List[int]:
+        """
+        text 中出现的术语序号（按出现顺序，不重复）
+
+        按最左最长、互不重叠匹配（"静真さん" 只算 "静真さん"，不再单独算 "静真"）；
+        片假名术语前后紧接片假名时视为其他词的一部分（"リン" 不匹配 "リンゴ"）
+        """
+        result: List[int] = []
+        for start, end, idx in self._glossary_matcher.find_non_overlapping(text):
+            if idx in result:
+                continue
+            term = self._glossary_terms[idx]
+            if start > 0 and _is_katakana(term[0]) and _is_katakana(text[start - 1]):
+                continue
+            if end < len(text) and _is_katakana(term[-1]) and _is_katakana(text[end]):
+                continue
+            result.append(idx)
+        return result
+
+    @rule(summary='glossary_summary', warning=True)
+    def check_glossary(self, e: Entry, errors: List[str], tally: Dict[str, List[int]]) -> bool:
+        """
+        检查原文中出现的术语/人名，译文中是否使用了术语表规定的译名
+
+        每个条目每个术语只计一次，全角/半角写法视为相同（"男Ａ" 与 "男A"）
+        """
+        orig, tran = e.orig, e.tran
+        if orig is None:
+            return True
+
+        glossary = self._glossary
+        if glossary is None:
+            glossary = self.load_glossary()
+        if not glossary:
+            return True
+        terms = self._glossary_terms
+
+        success = True
+        for field in ('message', 'name'):
+            source = orig.get(field)
+            if not isinstance(source, str) or field not in tran:
+                continue
+            if field == 'name':
+                # 人名种类很少，按原文缓存匹配结果
+                found = self._glossary_name_hits.get(source)
+                if found is None:
+                    found = self._glossary_name_hits[source] = self.glossary_terms_in(source)
+            else:
+                found = self.glossary_terms_in(source)
+            if not found:
+                continue
+            target = tran[field]
+            for idx in found:
+                expected = glossary[terms[idx]]
+                if expected in target:
+                    continue
+                if unicodedata.normalize('NFKC', expected) in unicodedata.normalize('NFKC', target):
+                    continue
+                tally.setdefault(terms[idx], []).append(e.index)
+                success = False
 
         return success
 
+    def glossary_summary(self, tally: Dict[str, List[int]]) -> List[str]:
+        """术语不一致的汇总：按次数从多到少列出每个术语及出现的条目索引"""
+        if not tally:
+            return []
+        glossary = self.load_glossary()
+        total = sum(len(indices) for indices in tally.values())
+        lines = [f"术语不一致: {len(tally)} 个术语，共 {total} 处"]
+        for term, indices in sorted(tally.items(), key=lambda kv: (-len(kv[1]), kv[1][0])):
+            shown = ', '.join(str(i) for i in indices[:self.glossary_max_indices])
+            more = ' ...' if len(indices) > self.glossary_max_indices else ''
+            lines.append(f"  {term} -> {glossary[term]}: {len(indices)} 处 (索引 {shown}{more})")
+        lines.append("")
+        return lines
+
     def extract_special_chars(self, text: str) -> List[str]:
-        """从文本中提取特殊字符序列"""
-        result = []
-        i = 0
-        while i < len(text):
-            if text[i] == '@' and i + 1 < len(text):
-                char_pair = text[i:i+2]
-                if char_pair in self.special_chars:
-                    result.append(char_pair)
-                    i += 2  # 跳过两个字符
-                    continue
-            i += 1
-        return result
+        """从文本中提取特殊字符序列（从左到右，互不重叠）"""
+        matcher = self.matcher(self.special_chars)
+        return [self.special_chars[idx] for _, _, idx in matcher.find_non_overlapping(text)]
 
-    def check_special_characters(self) -> bool:
+    @rule()
+    def check_special_characters(self, e: Entry, errors: List[str]) -> bool:
         """检查特殊字的顺序和数量是否一致"""
+        orig, tran = e.orig, e.tran
+        if orig is None:
+            return True
+
         success = True
+        i = e.index
+
+        # 检查message字段
+        if 'message' in orig and 'message' in tran:
+            orig_chars = self.extract_special_chars(orig['message'])
+            tran_chars = self.extract_special_chars(tran['message'])
+
+            if orig_chars != tran_chars:
+                errors.append(
+                    f"索引 {i} message字段特殊字符不匹配: "
+                    f"原文有 {len(orig_chars)} 个 [{', '.join(orig_chars)}]，"
+                    f"译文有 {len(tran_chars)} 个 [{', '.join(tran_chars)}]")
+                self.print_item_error(errors, orig, tran)
+                success = False
 
-        for i, (orig, tran) in enumerate(zip(self.original, self.translated)):
-            # 检查message字段
-            if 'message' in orig and 'message' in tran:
-                orig_chars = self.extract_special_chars(orig['message'])
-                tran_chars = self.extract_special_chars(tran['message'])
-
-                if orig_chars != tran_chars:
-                    self.errors.append(
-                        f"索引 {i} message字段特殊字符不匹配: "
-                        f"原文有 {len(orig_chars)} 个 [{', '.join(orig_chars)}]，"
-                        f"译文有 {len(tran_chars)} 个 [{', '.join(tran_chars)}]")
-                    self.print_item_error(i, orig, tran)
-                    success = False
-
-            # 检查name字段（如果存在）
-            if 'name' in orig and 'name' in tran:
-                orig_name_chars = self.extract_special_chars(orig['name'])
-                tran_name_chars = self.extract_special_chars(tran['name'])
-
-                if orig_name_chars != tran_name_chars:
-                    self.errors.append(
-                        f"索引 {i} name字段特殊字符不匹配: "
-                        f"原文有 {len(orig_name_chars)} 个 [{', '.join(orig_name_chars)}]，"
-                        f"译文有 {len(tran_name_chars)} 个 [{', '.join(tran_name_chars)}]")
-                    self.print_item_error(i, orig, tran)
-                    success = False
-
-            # 检查字段存在性是否一致
-            if ('name' in orig) != ('name' in tran):
-                self.errors.append(
-                    f"索引 {i} name字段存在性不匹配: "
-                    f"原文{'有' if 'name' in orig else '无'}name字段，"
-                    f"译文{'有' if 'name' in tran else '无'}name字段")
-                self.print_item_error(i, orig, tran)
+        # 检查name字段（如果存在）
+        if 'name' in orig and 'name' in tran:
+            orig_name_chars = self.extract_special_chars(orig['name'])
+            tran_name_chars = self.extract_special_chars(tran['name'])
+
+            if orig_name_chars != tran_name_chars:
+                errors.append(
+                    f"索引 {i} name字段特殊字符不匹配: "
+                    f"原文有 {len(orig_name_chars)} 个 [{', '.join(orig_name_chars)}]，"
+                    f"译文有 {len(tran_name_chars)} 个 [{', '.join(tran_name_chars)}]")
+                self.print_item_error(errors, orig, tran)
                 success = False
 
+        # 检查字段存在性是否一致
+        if ('name' in orig) != ('name' in tran):
+            errors.append(
+                f"索引 {i} name字段存在性不匹配: "
+                f"原文{'有' if 'name' in orig else '无'}name字段，"
+                f"译文{'有' if 'name' in tran else '无'}name字段")
+            self.print_item_error(errors, orig, tran)
+            success = False
+
         return success
 
-    def print_item_error(self, index: int, original_item: Dict, translated_item: Dict):
+    def print_item_error(self, errors: List[str], original_item: Dict, translated_item: Dict):
         """打印出错项的详细信息"""
-        self.errors.append(f"  原文: {original_item}")
-        self.errors.append(f"  译文: {translated_item}")
-        self.errors.append("")
+        errors.append(f"  原文: {original_item}")
+        errors.append(f"  译文: {translated_item}")
+        errors.append("")
+
+    def field_errors(self, i: int, tran: Any) -> List[str]:
+        """条目结构错误：message 缺失或不是字符串、name 存在但不是字符串"""
+        if not isinstance(tran, dict):
+            return [f"索引 {i} 条目不是对象: {tran!r}"]
+        errors = []
+        if 'message' not in tran:
+            errors.append(f"索引 {i} 缺少message字段")
+        elif not isinstance(tran['message'], str):
+            errors.append(f"索引 {i} message字段不是字符串: {tran['message']!r}")
+        if 'name' in tran and not isinstance(tran['name'], str):
+            errors.append(f"索引 {i} name字段不是字符串: {tran['name']!r}")
+        return errors
+
+    def check_range(self, plan: "RulePlan", start: int, end: int
+                    ) -> Tuple[List[List[str]], List[bool], List[bool], List[Dict | None], List[str]]:
+        """
+        检查 translated[start:end]，
+        返回 (每个规则的错误, 每个规则是否通过, 每个规则是否因异常停用, 每个规则的 tally, 结构错误)
+
+        条目只遍历一次：所有 message/name 先用合并后的正则一次扫描完成字符分类，
+        每个条目再依次交给各个启用的规则（规则按 rule() 声明的字符类别、预筛选和长度门槛
+        决定是否调用，大多数条目不需要调用任何规则）。
+        规则抛出异常时记录错误，并在后续条目中停用该规则。
+        message/name 缺失或类型错误的条目只报告结构错误，不交给任何规则。
+        """
+        checks, classes, filters = plan.checks, plan.classes, plan.filters
+        min_lens, thresholds, classifier = plan.min_lens, plan.thresholds, plan.classifier
+
+        rule_errors: List[List[str]] = [[] for _ in checks]
+        passed = [True] * len(checks)
+        stopped = [False] * len(checks)
+        # 声明了 summary 的规则额外接收 tally
+        tallies: List[Dict | None] = [{} if summary else None for summary in plan.summaries]
+        rule_args = [(rule_errors[k],) if tallies[k] is None else (rule_errors[k], tallies[k])
+                     for k in range(len(checks))]
+        active = list(range(len(checks)))
+        # (message 字符, name 字符, 长度分桶) -> (分组, 分组, 需要调用的规则)，
+        # 组合很少，缓存后每个条目只需一次字典查找
+        dispatch: Dict[Tuple[str, str, int], Tuple[Dict, Dict, List[int]]] = {}
+
+        translated = self.translated[start:end]
+        structure_errors: List[str] = []
+        malformed = set()
+        for j, t in enumerate(translated):
+            if not (isinstance(t, dict) and isinstance(t.get('message'), str)
+                    and isinstance(t.get('name', ''), str)):
+                structure_errors.extend(self.field_errors(start + j, t))
+                malformed.add(j)
+        if malformed:
+            translated = [{'message': ''} if j in malformed else t
+                          for j, t in enumerate(translated)]
+        messages = [t['message'] for t in translated]
+        msg_hits = classifier.scan(messages)
+        name_hits = classifier.scan([t.get('name', '') for t in translated])
+        if thresholds:
+            buckets = [bisect.bisect_left(thresholds, len(m)) for m in messages]
+        else:
+            buckets = [0] * len(messages)
+
+        def wanted(k: int, msg: str, bucket: int, chars: Dict, name_chars: Dict) -> bool:
+            cls = classes[k]
+            if cls and cls.isdisjoint(chars) and cls.isdisjoint(name_chars):
+                return False
+            if min_lens[k] is not None and bucket <= thresholds.index(min_lens[k]):
+                return False
+            return filters[k] is None or filters[k](msg)
+
+        original = self.original
+        orig_count = len(original)
+
+        for j, tran in enumerate(translated):
+            key = (msg_hits[j], name_hits[j], buckets[j])
+            cached = dispatch.get(key)
+            if cached is None:
+                chars = classifier.group(key[0])
+                name_chars = classifier.group(key[1])
+                todo = [k for k in active
+                        if wanted(k, key[0], key[2], chars, name_chars)]
+                cached = dispatch[key] = (chars, name_chars, todo)
+            chars, name_chars, todo = cached
+            if not todo or j in malformed:
+                continue
 
-    def run_checks(self) -> bool:
-        """运行所有检查"""
+            i = start + j
+            entry = Entry(i, original[i] if i < orig_count else None,
+                          tran, chars, name_chars)
+
+            crashed = False
+            for k in todo:
+                try:
+                    if not checks[k](entry, *rule_args[k]):
+                        passed[k] = False
+                except Exception as e:
+                    rule_errors[k].append(
+                        f"检查 {checks[k].__name__} 执行时出错: {str(e)}")
+                    passed[k] = False
+                    stopped[k] = crashed = True
+            if crashed:
+                active = [k for k in active if not stopped[k]]
+                dispatch.clear()
+
+        return rule_errors, passed, stopped, tallies, structure_errors
+
+    def run_checks(self, jobs: int = 1) -> bool:
+        """
+        运行所有检查
+
+        jobs > 1 时把条目按索引区间切块，在进程池中检查，每个工作进程只构建一次规则表。
+        每个规则的错误单独收集，最后按 self.checks 的顺序、再按区间顺序合并，
+        报告与逐个规则遍历时逐字节相同（某个规则在前面的区间因异常停用时，丢弃其后续区间的结果）。
+        warning 规则的输出进入 self.warnings，不影响返回值。
+        """
+        count = len(self.translated)
+        if jobs <= 1 or count < jobs * PARALLEL_MIN_ENTRIES:
+            results = [self.check_range(RulePlan(self), 0, count)]
+        else:
+            step = -(-count // (jobs * 4))
+            starts = list(range(0, count, step))
+            ends = [min(start + step, count) for start in starts]
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(self,)) as pool:
+                results = list(pool.map(_worker_check_range, starts, ends))
+
+        plan = RulePlan(self)
         all_passed = True
-
-        for check in self.checks:
-            try:
-                if not check():
-                    all_passed = False
-            except Exception as e:
-                self.errors.append(f"检查 {check.__name__} 执行时出错: {str(e)}")
+        # 结构错误最先列出
+        for *_, structure_errors in results:
+            if structure_errors:
+                self.errors.extend(structure_errors)
                 all_passed = False
+        for k, check in enumerate(plan.checks):
+            output = self.warnings if plan.warnings[k] else self.errors
+            tally: Dict = {}
+            for rule_errors, passed, stopped, tallies, _ in results:
+                output.extend(rule_errors[k])
+                if not plan.warnings[k]:
+                    all_passed = all_passed and passed[k]
+                if tallies[k]:
+                    for key, values in tallies[k].items():
+                        tally.setdefault(key, []).extend(values)
+                if stopped[k]:
+                    break
+            if plan.summaries[k]:
+                output.extend(getattr(self, plan.summaries[k])(tally))
 
         return all_passed
 
     def print_errors(self):
-        """打印所有错误信息"""
+        """打印所有错误信息，警告在其后单独列出"""
         if self.errors:
             print("检查发现以下错误:")
             for error in self.errors:
@@ -586,6 +936,44 @@ class JSONChecker:
         else:
             print("所有检查通过!")
 
+        if self.warnings:
+            print("检查发现以下警告（不影响检查结果）:")
+            for warning in self.warnings:
+                print(warning)
+
+
+class RulePlan:
+    """启用的规则及其调度信息（字符类别、预筛选、长度门槛、合并后的分类正则）"""
+
+    def __init__(self, checker: JSONChecker):
+        self.checks = list(checker.checks)
+        self.classes = [getattr(check, 'char_classes', frozenset()) for check in self.checks]
+        self.filters = [getattr(check, 'hits_filter', None) for check in self.checks]
+        self.min_lens = [getattr(checker, attr) if (attr := getattr(check, 'min_len', None)) else None
+                         for check in self.checks]
+        # 长度门槛排序去重，条目按 "超过了几个门槛" 分桶
+        self.thresholds = sorted({n for n in self.min_lens if n is not None})
+        self.classifier = CharClassifier(sorted(set().union(*self.classes)))
+        self.summaries = [getattr(check, 'summary', None) for check in self.checks]
+        self.warnings = [getattr(check, 'warning', False) for check in self.checks]
+
+
+# 每个区间至少这么多条目才值得并行
+PARALLEL_MIN_ENTRIES = 2000
+
+# 工作进程中的检查器和规则表，由 _init_worker 构建一次
+_worker_state: Tuple[JSONChecker, RulePlan] | None = None
+
+
+def _init_worker(checker: JSONChecker):
+    global _worker_state
+    _worker_state = (checker, RulePlan(checker))
+
+
+def _worker_check_range(start: int, end: int):
+    checker, plan = _worker_state
+    return checker.check_range(plan, start, end)
+
 
 def load_json_file(file_path: str) -> List[Dict]:
     """加载JSON文件"""
@@ -597,28 +985,32 @@ def load_json_file(file_path: str) -> List[Dict]:
         sys.exit(1)
 
 
-def main(original_file: str, translated_file: str):
-    # 加载JSON文件
-    original_json = load_json_file(original_file)
-    translated_json = load_json_file(translated_file)
-
+def check_items(original_json: List[Dict], translated_json: List[Dict], jobs: int = 1) -> bool:
+    """检查内存中的原文和译文并输出结果，返回是否全部通过"""
     # 创建检查器并运行检查
     checker = JSONChecker(original_json, translated_json)
-    success = checker.run_checks()
+    success = checker.run_checks(jobs)
 
     # 输出结果
     checker.print_errors()
+    return success
 
-    # 根据检查结果返回适当的退出码
-    return 0 if success else 1
 
+def main(original_file: str, translated_file: str, jobs: int = 1):
+    # 加载JSON文件
+    original_json = load_json_file(original_file)
+    translated_json = load_json_file(translated_file)
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("用法: python json_checker.py <原文json文件> <译文json文件>")
-        sys.exit(1)
+    # 根据检查结果返回适当的退出码
+    return 0 if check_items(original_json, translated_json, jobs) else 1
 
-    original_file = sys.argv[1]
-    translated_file = sys.argv[2]
 
-    sys.exit(main(original_file, translated_file))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检查译文 JSON 与原文 JSON 的一致性")
+    parser.add_argument("original_file", help="原文json文件")
+    parser.add_argument("translated_file", help="译文json文件")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="并行进程数 (默认: 1)，输出与串行完全一致")
+    args = parser.parse_args()
+
+    sys.exit(main(args.original_file, args.translated_file, args.jobs))
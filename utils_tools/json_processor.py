@@ -6,7 +6,7 @@ from typing import Dict, List, Any, Optional, Tuple
 
 
 class JSONProcessor:
-    def __init__(self, file_path: str, mode: str):
+    def __init__(self, file_path: Optional[str], mode: str):
         self.file_path = file_path
         self.mode = mode
         self.data = None
@@ -249,11 +249,8 @@ class JSONProcessor:
         if 'name' in item and isinstance(item['name'], str):
             item['name'] = item['name'].replace('@', '\\')
 
-    def process(self) -> None:
-        """执行处理流程"""
-        # 加载数据
-        self.data = self.load_json()
-
+    def process_items(self, items: List[Dict]) -> int:
+        """对内存中的条目原地应用当前模式的处理函数，返回执行的处理函数个数"""
         # 检查模式是否有效
         if self.mode not in self.process_functions:
             print(f"错误: 不支持的模式 '{self.mode}'")
@@ -264,17 +261,24 @@ class JSONProcessor:
         functions = self.process_functions[self.mode]
 
         # 对每个条目应用处理函数
-        processed_count = 0
-        for item in self.data:
+        for item in items:
             for func in functions:
                 func(item)
-            processed_count += 1
+
+        return len(functions)
+
+    def process(self) -> None:
+        """执行处理流程"""
+        # 加载数据
+        self.data = self.load_json()
+
+        function_count = self.process_items(self.data)
 
         # 保存处理后的数据
         self.save_json()
 
         print(f"处理完成! 模式: {self.mode}, 文件: {self.file_path}")
-        print(f"处理了 {processed_count} 个条目，执行了 {len(functions)} 个处理函数")
+        print(f"处理了 {len(self.data)} 个条目，执行了 {function_count} 个处理函数")
         print(f"当前支持的标记类型: {list(self.tag_mappings.keys())}")
 
 
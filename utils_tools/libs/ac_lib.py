@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+"""
+多模式字符串匹配（Aho–Corasick 自动机）
+
+一次线性扫描找出文本中所有模式串的出现位置，耗时与模式串数量无关，
+用于禁用词、特殊 token、术语表等需要同时查找大量词的场景：
+
+    matcher = AhoCorasick(["学长", "学姐", "@p"])
+    matcher.found("学长说@p")          # {0, 2}
+    list(matcher.iter_matches(text))   # [(start, end, 模式序号), ...]
+
+自动机处于初始状态时只有模式串的首字符能让它离开初始状态，扫描时用正则跳到
+下一个首字符，其余字符在 C 层跳过。本模块不依赖其他库，utils_tools 下的脚本可以直接导入。
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[str]):
+        """
+        参数:
+            patterns: 模式串列表，匹配结果中的模式序号即其在列表中的位置。空串会被忽略
+        """
+        self.patterns: List[str] = list(patterns)
+
+        # 字典树：goto[状态] 为 字符 -> 下一状态
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[int, ...]] = [()]
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (idx,)
+
+        # 失败指针，按层次遍历计算；每个状态的输出合并其失败链上的输出
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+        firsts = sorted(self._goto[0])
+        self._starts = re.compile(
+            f"[{''.join(re.escape(ch) for ch in firsts)}]") if firsts else None
+        self._reverse_trie: List[Dict[str, int]] | None = None
+        self._reverse_out: List[Tuple[int, ...]] = []
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        按结束位置顺序产出所有（可重叠的）匹配 (start, end, 模式序号)，
+        同一结束位置的多个匹配按模式串由长到短
+        """
+        if self._starts is None:
+            return
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        search = self._starts.search
+        length = len(text)
+        found = search(text)
+        while found:
+            # 从首字符开始走自动机，回到初始状态后再跳到下一个首字符
+            pos = found.start()
+            state = 0
+            while pos < length:
+                ch = text[pos]
+                pos += 1
+                while True:
+                    nxt = goto[state].get(ch)
+                    if nxt is not None:
+                        state = nxt
+                        break
+                    if not state:
+                        break
+                    state = fail[state]
+                for idx in out[state]:
+                    yield pos - len(patterns[idx]), pos, idx
+                if not state:
+                    break
+            found = search(text, pos)
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """所有（可重叠的）匹配，见 iter_matches"""
+        return list(self.iter_matches(text))
+
+    def found(self, text: str) -> Set[int]:
+        """文本中出现过的模式序号"""
+        return {idx for _, _, idx in self.iter_matches(text)}
+
+    def find_non_overlapping(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        从左到右取不重叠的匹配：起点最靠左者优先，起点相同时取最长的模式，
+        长度也相同时取序号小的模式
+        """
+        matches = list(self.iter_matches(text))
+        if len(matches) < 2:
+            return matches
+        matches.sort(key=lambda m: (m[0], m[0] - m[1], m[2]))
+        result = []
+        last_end = 0
+        for start, end, idx in matches:
+            if start >= last_end:
+                result.append((start, end, idx))
+                last_end = end
+        return result
+
+    def suffix_matches(self, text: str, end: int | None = None) -> List[int]:
+        """
+        以 text[:end] 结尾的模式序号（按序号排序），只检查尾部，与文本长度无关
+        """
+        if self._reverse_trie is None:
+            self._build_reverse_trie()
+        trie, out = self._reverse_trie, self._reverse_out
+        pos = len(text) if end is None else end
+        state = 0
+        result: List[int] = []
+        while pos > 0:
+            state = trie[state].get(text[pos - 1])
+            if state is None:
+                break
+            result.extend(out[state])
+            pos -= 1
+        result.sort()
+        return result
+
+    def _build_reverse_trie(self):
+        trie: List[Dict[str, int]] = [{}]
+        out: List[Tuple[int, ...]] = [()]
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in reversed(pattern):
+                nxt = trie[state].get(ch)
+                if nxt is None:
+                    nxt = len(trie)
+                    trie[state][ch] = nxt
+                    trie.append({})
+                    out.append(())
+                state = nxt
+            out[state] += (idx,)
+        self._reverse_trie, self._reverse_out = trie, out
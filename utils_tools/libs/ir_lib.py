@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+"""
+脚本中间格式的读写
+
+反汇编结果 {"opcodes": [...], "text": [...]} 可以保存为两种格式：
+    - json: 便于人工阅读和编辑，操作数写作 "u32:5" 形式的字符串
+    - bin:  紧凑的二进制格式，用 struct/array 直接加载
+
+内存中的操作数为 (类型, 值) 元组或 str，只在 json 边界做字符串转换。
+
+bin 格式（小端序）:
+    头部      magic "BGIR", u16 版本, u16 保留,
+              u32 opcode 数, u32 参数总数, u32 文本数, u32 字符串数, u32 字符串区字节数
+    opcode 表 每项 <IIIiI: op 名字符串序号, offset, index, target_idx(-1 表示无), 参数个数
+    参数类型  每个参数 1 字节类型码（0 为 str，1~6 为整数类型，7 为 bytes）
+    参数值    每个参数 1 个 i64；整数类型为数值，str/bytes 为字符串序号（bytes 存为 hex）
+    文本表    每项 <II: 字符串序号, offset
+    字符串区  u32 长度数组 + UTF-8 拼接数据（去重）
+"""
+
+import json
+import struct
+import sys
+from array import array
+from typing import Dict, List
+from utils_tools.libs.translate_lib import bytes_to_hex_string, operand_from_str, operand_to_str
+
+IR_MAGIC = b"BGIR"
+IR_VERSION = 2
+
+SCRIPT_FORMATS = ("json", "bin")
+
+_HEADER = struct.Struct("<4sHHIIIII")
+_OP = struct.Struct("<IIIiI")
+_TEXT = struct.Struct("<II")
+
+_TYPE_STR = 0
+_TYPE_BYTES = 7
+_INT_TYPES = ("u8", "u16", "u32", "i8", "i16", "i32")
+_TYPE_CODES = {t: i + 1 for i, t in enumerate(_INT_TYPES)}
+_TYPE_CODES["bytes"] = _TYPE_BYTES
+_TYPE_NAMES = ["str", *_INT_TYPES, "bytes"]
+
+_OP_KEYS = ("op", "offset", "index", "value", "target_idx")
+
+
+def _native_array(typecode: str, data=b"") -> array:
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def _little_endian_bytes(arr: array) -> bytes:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def dump_ir(script: Dict) -> bytes:
+    """将反汇编结果编码为 bin 格式"""
+    if set(script) != {"opcodes", "text"}:
+        raise ValueError(f"不支持的顶层字段: {sorted(script)}")
+
+    strings: List[str] = []
+    string_idx: Dict[str, int] = {}
+
+    def intern(s: str) -> int:
+        idx = string_idx.get(s)
+        if idx is None:
+            idx = string_idx[s] = len(strings)
+            strings.append(s)
+        return idx
+
+    op_records = bytearray()
+    types = array("B")
+    values = array("q")
+
+    for op in script["opcodes"]:
+        extra = set(op) - set(_OP_KEYS)
+        if extra:
+            raise ValueError(f"OP #{op.get('index')} 含有不支持的字段: {sorted(extra)}")
+
+        op_values = op["value"]
+        op_records += _OP.pack(intern(op["op"]), op["offset"], op["index"],
+                               op.get("target_idx", -1), len(op_values))
+
+        for v in op_values:
+            if isinstance(v, str):
+                types.append(_TYPE_STR)
+                values.append(intern(v))
+            elif v[0] == "bytes":
+                types.append(_TYPE_BYTES)
+                values.append(intern(bytes_to_hex_string(v[1])))
+            else:
+                types.append(_TYPE_CODES[v[0]])
+                values.append(v[1])
+
+    text_records = bytearray()
+    for t in script["text"]:
+        text_records += _TEXT.pack(intern(t["value"]), t["offset"])
+
+    encoded = [s.encode("utf-8") for s in strings]
+    lengths = array("I", [len(b) for b in encoded])
+    blob = b"".join(encoded)
+
+    out = bytearray(_HEADER.pack(IR_MAGIC, IR_VERSION, 0, len(script["opcodes"]),
+                                 len(values), len(script["text"]), len(strings), len(blob)))
+    out += op_records
+    out += types.tobytes()
+    out += _little_endian_bytes(values)
+    out += text_records
+    out += _little_endian_bytes(lengths)
+    out += blob
+    return bytes(out)
+
+
+def load_ir(data: bytes) -> Dict:
+    """解码 bin 格式，返回与 load_script 读取 json 格式完全相同的结构"""
+    if len(data) < _HEADER.size:
+        raise ValueError("bin 文件过短")
+    magic, version, _, op_count, value_count, text_count, string_count, blob_size = \
+        _HEADER.unpack_from(data, 0)
+    if magic != IR_MAGIC:
+        raise ValueError("不是有效的 bin 脚本文件")
+    if version != IR_VERSION:
+        raise ValueError(
+            f"不支持的 bin 版本: {version} (当前 {IR_VERSION})，请重新反汇编或转换")
+
+    pos = _HEADER.size
+    op_end = pos + op_count * _OP.size
+    ops = _OP.iter_unpack(data[pos:op_end])
+    pos = op_end
+
+    types = data[pos:pos + value_count]
+    pos += value_count
+    values = _native_array("q", data[pos:pos + value_count * 8])
+    pos += value_count * 8
+
+    text_end = pos + text_count * _TEXT.size
+    texts = _TEXT.iter_unpack(data[pos:text_end])
+    pos = text_end
+
+    lengths = _native_array("I", data[pos:pos + string_count * 4])
+    pos += string_count * 4
+    if pos + blob_size != len(data):
+        raise ValueError("bin 文件长度与头部不一致")
+
+    strings = []
+    for n in lengths:
+        strings.append(data[pos:pos + n].decode("utf-8"))
+        pos += n
+
+    names = _TYPE_NAMES
+    operands = [strings[v] if t == _TYPE_STR
+                else (names[t], v) if t != _TYPE_BYTES
+                else ("bytes", bytes.fromhex(strings[v]))
+                for t, v in zip(types, values)]
+
+    opcodes = []
+    vi = 0
+    for op_idx, offset, index, target_idx, count in ops:
+        op = {"op": strings[op_idx], "offset": offset,
+              "index": index, "value": operands[vi:vi + count]}
+        vi += count
+        if target_idx >= 0:
+            op["target_idx"] = target_idx
+        opcodes.append(op)
+
+    text = [{"value": strings[s], "offset": offset} for s, offset in texts]
+
+    return {"opcodes": opcodes, "text": text}
+
+
+def script_format(path: str) -> str:
+    """根据扩展名判断脚本格式"""
+    return "bin" if path.lower().endswith(".bin") else "json"
+
+
+def load_script(path: str) -> Dict:
+    """按扩展名读取 json 或 bin 格式的脚本"""
+    if script_format(path) == "bin":
+        with open(path, "rb") as f:
+            return load_ir(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        script = json.load(f)
+    for op in script["opcodes"]:
+        op["value"] = [operand_from_str(v) for v in op["value"]]
+    return script
+
+
+def save_script(path: str, script: Dict):
+    """按扩展名保存 json 或 bin 格式的脚本"""
+    if script_format(path) == "bin":
+        with open(path, "wb") as f:
+            f.write(dump_ir(script))
+        return
+    script = dict(script, opcodes=[
+        dict(op, value=[operand_to_str(v) for v in op["value"]])
+        for op in script["opcodes"]])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(script, f, ensure_ascii=False, indent=2)
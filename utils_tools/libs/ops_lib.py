@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
+import struct
 from typing import Any, Callable, Dict, List, Literal, Tuple, Union
-from utils_tools.libs.translate_lib import bytes_to_hex_string, de, read_bytes_s, read_i16_s, read_i32_s, read_i8_s, read_str_s, read_u16_s, read_u32_s, read_u8_s, se, str_to_bytes
+from utils_tools.libs.translate_lib import bytes_to_hex_string, make_operand, operand_to_bytes, read_bytes, read_i16, read_i32, read_i8, read_str_until_null, read_u16, read_u32, read_u8
 
 
 # ==========================================
@@ -10,14 +11,17 @@ from utils_tools.libs.translate_lib import bytes_to_hex_string, de, read_bytes_s
 
 
 class Handler:
-    def __init__(self, func):
+    def __init__(self, func, layout=None):
         self.func = func
+        # 定长处理器的布局：[(struct 格式字符, 类型名), ...]，变长处理器为 None
+        self.layout = layout
 
     def __call__(self, data, offset, ctx):
         return self.func(data, offset, ctx)
 
     def repeat(self, count):
-        return Handler(repeat_handler(self.func, count))
+        layout = self.layout * count if self.layout is not None else None
+        return Handler(repeat_handler(self.func, count), layout)
 
     def repeat_var(self, var_index=-1):
         return Handler(repeat_var_handler(self.func, var_index))
@@ -49,9 +53,9 @@ def repeat_var_handler(handler: Callable, var_index: int = -1) -> Callable:
     def wrapped_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[List[Any], int]:
         # 从上下文中获取重复次数
         count_value = ctx["value"][var_index]
-        # 如果值形如 "u32:5"，提取数字部分
-        if isinstance(count_value, str) and ":" in count_value:
-            count = int(count_value.split(":", 1)[1])
+        # 值形如 ("u32", 5)，取数字部分
+        if isinstance(count_value, tuple) and isinstance(count_value[1], int):
+            count = count_value[1]
         else:
             raise ValueError(f"非法的 count_value: {count_value}")
 
@@ -78,32 +82,38 @@ def args_handler(handler: Callable, *handler_args) -> Callable:
 # ==========================================
 
 
-def u8_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[str, int]:
-    return read_u8_s(data, offset)
+def u8_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[Tuple[str, int], int]:
+    val, offset = read_u8(data, offset)
+    return ("u8", val), offset
 
 
-def u16_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[str, int]:
-    return read_u16_s(data, offset)
+def u16_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[Tuple[str, int], int]:
+    val, offset = read_u16(data, offset)
+    return ("u16", val), offset
 
 
-def u32_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[str, int]:
-    return read_u32_s(data, offset)
+def u32_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[Tuple[str, int], int]:
+    val, offset = read_u32(data, offset)
+    return ("u32", val), offset
 
 
-def i8_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[str, int]:
-    return read_i8_s(data, offset)
+def i8_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[Tuple[str, int], int]:
+    val, offset = read_i8(data, offset)
+    return ("i8", val), offset
 
 
-def i16_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[str, int]:
-    return read_i16_s(data, offset)
+def i16_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[Tuple[str, int], int]:
+    val, offset = read_i16(data, offset)
+    return ("i16", val), offset
 
 
-def i32_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[str, int]:
-    return read_i32_s(data, offset)
+def i32_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[Tuple[str, int], int]:
+    val, offset = read_i32(data, offset)
+    return ("i32", val), offset
 
 
 def string_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[str, int]:
-    return read_str_s(data, offset)
+    return read_str_until_null(data, offset)
 
 
 # ==========================================
@@ -124,8 +134,9 @@ def end_handler(data: bytes, offset: int, ctx: Dict) -> Tuple[str, int]:
 # ==========================================
 
 
-def byte_slice_handler(data: bytes, offset: int, ctx: Dict, length: int) -> Tuple[str, int]:
-    return read_bytes_s(data, offset, length)
+def byte_slice_handler(data: bytes, offset: int, ctx: Dict, length: int) -> Tuple[Tuple[str, bytes], int]:
+    val, offset = read_bytes(data, offset, length)
+    return ("bytes", val), offset
 
 
 # ==========================================
@@ -133,12 +144,12 @@ def byte_slice_handler(data: bytes, offset: int, ctx: Dict, length: int) -> Tupl
 # ==========================================
 
 
-u8 = Handler(u8_handler)
-u16 = Handler(u16_handler)
-u32 = Handler(u32_handler)
-i8 = Handler(i8_handler)
-i16 = Handler(i16_handler)
-i32 = Handler(i32_handler)
+u8 = Handler(u8_handler, [("B", "u8")])
+u16 = Handler(u16_handler, [("H", "u16")])
+u32 = Handler(u32_handler, [("I", "u32")])
+i8 = Handler(i8_handler, [("b", "i8")])
+i16 = Handler(i16_handler, [("h", "i16")])
+i32 = Handler(i32_handler, [("i", "i32")])
 string = Handler(string_handler)
 byte_slice = Handler(byte_slice_handler)
 end = Handler(end_handler)
@@ -148,63 +159,74 @@ end = Handler(end_handler)
 # 解析引擎
 # ==========================================
 
-def parse_data(debug_info: dict, data: bytes, flatten_opcodes_map: Dict) -> Tuple[List[Dict], int]:
+def parse_data(debug_info: dict, data: bytes, flatten_opcodes_map: Dict,
+               log: Callable[[str], Any] = print) -> Tuple[List[Dict], int]:
+    """
+    解析 opcode 区，返回 opcodes 列表和解析结束的偏移。
+    log 用于输出解析错误，并行处理时可传入缓冲函数以免输出交错。
+    """
     opcodes = []
     cur_offset = 0
     total_len = len(data)
 
-    # 按键长度降序排序
-    sorted_keys = sorted(flatten_opcodes_map.keys(), key=len, reverse=True)
+    # 普通 dict 先编译为带前缀树的 OpcodeMap
+    if not isinstance(flatten_opcodes_map, OpcodeMap):
+        flatten_opcodes_map = OpcodeMap(flatten_opcodes_map)
+    match = flatten_opcodes_map.match
 
     while cur_offset < total_len:
         try:
             matched = False
             start_offset = cur_offset
 
-            for signature in sorted_keys:
-                if data.startswith(signature, cur_offset):
-                    # 找到匹配项
-                    handlers = flatten_opcodes_map[signature]
-                    new_offset = cur_offset + len(signature)
-
-                    # 构建 Opcode 对象
-                    op_hex = bytes_to_hex_string(signature)
-                    cur_op = {
-                        "op": op_hex,
-                        "offset": start_offset,
-                        "index": len(opcodes),
-                        "value": []
-                    }
-
-                    # 执行处理链
-                    param_offset = new_offset
-                    try:
-                        for handler in handlers:
-                            res, param_offset = handler(
-                                data, param_offset, cur_op)
-
-                            if res != None:
-                                if isinstance(res, list):
-                                    cur_op['value'].extend(res)
-                                else:
-                                    cur_op['value'].append(res)
-                    except EndParsing:
-                        opcodes.append(cur_op)
-                        return opcodes, param_offset
-
+            found = match(data, cur_offset)
+            if found is not None:
+                signature, op_hex, plan = found
+                new_offset = cur_offset + len(signature)
+
+                # 构建 Opcode 对象
+                values = []
+                cur_op = {
+                    "op": op_hex,
+                    "offset": start_offset,
+                    "index": len(opcodes),
+                    "value": values
+                }
+
+                # 执行处理计划
+                param_offset = new_offset
+                try:
+                    for st, arg in plan:
+                        if st is not None:
+                            # 定长段：一次 unpack_from 解出全部参数
+                            values.extend(
+                                zip(arg, st.unpack_from(data, param_offset)))
+                            param_offset += st.size
+                            continue
+
+                        res, param_offset = arg(data, param_offset, cur_op)
+
+                        if res != None:
+                            if isinstance(res, list):
+                                values.extend(res)
+                            else:
+                                values.append(res)
+                except EndParsing:
                     opcodes.append(cur_op)
-                    cur_offset = param_offset
-                    matched = True
-                    break
+                    return opcodes, param_offset
+
+                opcodes.append(cur_op)
+                cur_offset = param_offset
+                matched = True
 
             if not matched:
                 unknown_byte = data[cur_offset]
-                print(
+                log(
                     f"{debug_info['file_name']}: 未知 Opcode {hex(unknown_byte)} 在 {hex(cur_offset + debug_info['offset'])}")
                 break
         except Exception as e:
             op = data[cur_offset]
-            print(
+            log(
                 f"{debug_info['file_name']}: 处理 Opcode {hex(op)} 在 {hex(cur_offset + debug_info['offset'])} 发生错误 {e}")
             break
 
@@ -219,7 +241,76 @@ def h(hex_str: str) -> bytes:
     return bytes.fromhex(hex_str)
 
 
-def flat(opcodes_map: Dict) -> Dict:
+def compile_handlers(handlers: List[Handler], fuse_layouts: bool = True) -> List[Tuple[Any, Any]]:
+    """
+    将处理器列表编译为处理计划，计划的每一步为:
+        - (struct.Struct, [类型名, ...])：连续的定长处理器合并为一次 unpack_from
+        - (None, handler)：变长处理器，按原方式调用
+    """
+    plan = []
+    layout = []
+
+    def flush():
+        if layout:
+            st = struct.Struct("<" + "".join(c for c, _ in layout))
+            plan.append((st, [t for _, t in layout]))
+            layout.clear()
+
+    for handler in handlers:
+        if fuse_layouts and getattr(handler, "layout", None) is not None:
+            layout.extend(handler.layout)
+        else:
+            flush()
+            plan.append((None, handler))
+    flush()
+
+    return plan
+
+
+class OpcodeMap(dict):
+    """
+    扁平化后的 opcode 表：本身仍是 {签名: 处理器列表} 的 dict，
+    同时编译出按首字节分发的前缀树，用于 O(签名长度) 的最长前缀匹配，
+    以及每个 opcode 的处理计划（见 compile_handlers）。
+    构建后不应再修改其内容。
+    """
+
+    def __init__(self, opcodes_map=(), fuse_layouts: bool = True):
+        super().__init__(opcodes_map)
+
+        # 前缀树节点为 [子节点 dict, 终止项]，终止项为 (签名, op_hex, 处理计划)
+        self.table: List[Any] = [None] * 256
+        for signature, handlers in self.items():
+            node = self.table[signature[0]]
+            if node is None:
+                node = self.table[signature[0]] = [{}, None]
+            for b in signature[1:]:
+                node = node[0].setdefault(b, [{}, None])
+            node[1] = (signature, bytes_to_hex_string(signature),
+                       compile_handlers(handlers, fuse_layouts))
+
+    def match(self, data: bytes, offset: int):
+        """返回 data[offset:] 上最长匹配的 (签名, op_hex, 处理计划)，没有匹配时返回 None"""
+        if offset >= len(data):
+            return None
+        node = self.table[data[offset]]
+        if node is None:
+            return None
+
+        best = node[1]
+        total_len = len(data)
+        pos = offset + 1
+        while pos < total_len:
+            node = node[0].get(data[pos])
+            if node is None:
+                break
+            if node[1] is not None:
+                best = node[1]
+            pos += 1
+        return best
+
+
+def flat(opcodes_map: Dict) -> OpcodeMap:
     flat_opcodes_map = {}
 
     def flatten_opcodes(prefix: bytes, op_map: Dict):
@@ -241,7 +332,7 @@ def flat(opcodes_map: Dict) -> Dict:
         else:
             flat_opcodes_map[key] = value
 
-    return flat_opcodes_map
+    return OpcodeMap(flat_opcodes_map)
 
 
 def assemble_one_op(op_entry: Dict, byteorder: Literal["little", "big"] = 'little', str_encoding=None) -> bytes:
@@ -257,8 +348,85 @@ def assemble_one_op(op_entry: Dict, byteorder: Literal["little", "big"] = 'littl
 
     # 2. 参数顺序拼接
     for item in op_entry.get("value", []):
-        out += str_to_bytes(item, byteorder, str_encoding)
+        out += operand_to_bytes(item, byteorder, str_encoding)
+
+    return bytes(out)
+
+
+# 整数类型 -> (struct 格式字符, 字节数)
+_INT_FORMATS = {"u8": ("B", 1), "u16": ("H", 2), "u32": ("I", 4),
+                "i8": ("b", 1), "i16": ("h", 2), "i32": ("i", 4)}
+
+
+def assemble_script(file: str, opcodes: List[Dict], text_segments: List[Tuple[int, bytes]],
+                    fix_ops_map: Dict, byteorder: Literal["little", "big"] = 'little',
+                    str_encoding=None) -> bytes:
+    """
+    单遍汇编：根据操作数类型直接算出每条 OP 的长度（字符串只编码一次），
+    在参数列表上修复偏移，最后用一次 struct.pack_into 写入预分配的 bytearray。
+    输出与 assemble_one_op + fix_offset 两遍汇编完全相同。
+
+    text_segments: 文本区 [(原 offset, 编码后的字节), ...]，按顺序追加在 opcode 区之后
+    """
+    if str_encoding is None:
+        def str_encoding(s): return s.encode("CP932") + b'\x00'
+
+    fmt = ["<" if byteorder == "little" else ">"]
+    args: List[Any] = []
+    old2new: Dict[int, int] = {}
+    # 需要修复偏移的参数：(args 中的位置, 原 offset, op)
+    fixups: List[Tuple[int, int, Dict]] = []
+    op_bytes_cache: Dict[str, bytes] = {}
+    cursor = 0
 
+    for op in opcodes:
+        old2new[op["offset"]] = cursor
+
+        op_key = op["op"]
+        op_bytes = op_bytes_cache.get(op_key)
+        if op_bytes is None:
+            op_bytes = op_bytes_cache[op_key] = bytes.fromhex(op_key)
+        fmt.append(f"{len(op_bytes)}s")
+        args.append(op_bytes)
+        cursor += len(op_bytes)
+
+        values = op.get("value", [])
+        first_arg = len(args)
+        for item in values:
+            if isinstance(item, str):
+                b = str_encoding(item)
+            elif item[0] == "bytes":
+                b = item[1]
+            else:
+                c, size = _INT_FORMATS[item[0]]
+                fmt.append(c)
+                args.append(item[1])
+                cursor += size
+                continue
+            fmt.append(f"{len(b)}s")
+            args.append(b)
+            cursor += len(b)
+
+        indices_spec = fix_ops_map.get(op_key)
+        if indices_spec is not None:
+            indices = indices_spec(op) if callable(indices_spec) else indices_spec
+            for i in indices:
+                fixups.append((first_arg + i % len(values), values[i][1], op))
+
+    for old_offset, seg in text_segments:
+        old2new[old_offset] = cursor
+        fmt.append(f"{len(seg)}s")
+        args.append(seg)
+        cursor += len(seg)
+
+    for arg_idx, old_offset, op in fixups:
+        new_offset = old2new.get(old_offset)
+        if new_offset is None:
+            raise ValueError(f"{file}, {op} 指向不存在的 offset: {old_offset}")
+        args[arg_idx] = new_offset
+
+    out = bytearray(cursor)
+    struct.pack_into("".join(fmt), out, 0, *args)
     return bytes(out)
 
 
@@ -280,9 +448,9 @@ def fix_offset(file: str, opcodes: Dict, old2new: Dict[int, int], fix_ops_map: D
             indices = indices_spec
 
         for i in indices:  # type: ignore
-            old_offset, type_hint = de(op['value'][i])
+            type_hint, old_offset = op['value'][i]
             if old_offset not in old2new:
                 raise ValueError(f"{file}, {op} 指向不存在的 offset: {old_offset}")
-            op['value'][i] = se(old2new[old_offset], type_hint)
+            op['value'][i] = make_operand(type_hint, old2new[old_offset])
 
     return opcodes
@@ -1,16 +1,22 @@
 #!/usr/bin/env python3
 
 import argparse
+from contextlib import contextmanager
 import glob
+import hashlib
 import json
 from pathlib import Path
 import re
 import shutil
+import stat
 import struct
 import subprocess
 import sys
 import os
-from typing import Any, Literal, Tuple
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, List, Literal, Tuple
 
 # ----------------------------------- 实用工具 ----------------------------------------
 
@@ -60,6 +66,271 @@ def system(command, check=True, capture_output=False, timeout=None, **kwargs):
         raise
 
 
+class Pipeline:
+    """
+    流水线阶段计时器
+
+    用法:
+        pipeline = Pipeline()
+        with pipeline.stage("解包"):
+            ...
+        pipeline.report()
+    """
+
+    def __init__(self):
+        self.timings: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        print(f"==> {name}")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append((name, time.perf_counter() - start))
+
+    def skip(self, name: str):
+        """记录一个因输入未变化而跳过的阶段"""
+        print(f"==> {name}（未变化，跳过）")
+        self.timings.append((f"{name}（跳过）", 0.0))
+
+    def report(self):
+        """输出各阶段的耗时"""
+        total = sum(t for _, t in self.timings)
+        print("各阶段耗时:")
+        for name, t in self.timings:
+            print(f"  {t:8.3f}s  {name}")
+        print(f"  {total:8.3f}s  合计")
+
+
+def module_sources(*modules: types.ModuleType) -> List[str]:
+    """
+    模块及其（递归）导入的本项目模块的源文件，用作构建目标的输入，
+    避免手写的依赖列表遗漏被间接调用的库。
+    只能看到模块级的 import（包括 from ... import 的函数/类），
+    函数内延迟导入的模块需要由调用方一并传入。
+    """
+    root = Path.cwd().resolve()
+    seen: Dict[str, types.ModuleType] = {}
+    pending = list(modules)
+    while pending:
+        module = pending.pop()
+        file = getattr(module, "__file__", None)
+        if not file or module.__name__ in seen:
+            continue
+        path = Path(file).resolve()
+        if root not in path.parents or "site-packages" in path.parts:
+            continue
+        seen[module.__name__] = module
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                pending.append(value)
+            elif isinstance(getattr(value, "__module__", None), str):
+                dep = sys.modules.get(value.__module__)
+                if dep is not None:
+                    pending.append(dep)
+    return sorted(_build_path(Path(m.__file__).resolve()) for m in seen.values())
+
+
+def _build_path(path) -> str:
+    """统一构建图中的路径写法：当前目录下的绝对路径转为相对路径"""
+    p = Path(path)
+    if p.is_absolute():
+        try:
+            p = p.relative_to(Path.cwd())
+        except ValueError:
+            pass
+    return p.as_posix()
+
+
+class BuildTarget:
+    def __init__(self, name: str, func: Callable[[], Any], inputs, outputs, fingerprint, after,
+                 always=False):
+        self.name = name
+        self.func = func
+        self.inputs = [_build_path(p) for p in inputs]
+        self.outputs = [_build_path(p) for p in outputs]
+        self.fingerprint = fingerprint
+        self.after = list(after)
+        self.always = always
+        self.deps: List[str] = []
+
+
+class BuildGraph:
+    """
+    声明式构建图，类似 make：
+
+        graph = BuildGraph("generated/build_state.json")
+        graph.target("汇编", asm, inputs=["generated/translated"], outputs=["generated/asmed"])
+        graph.run()
+
+    每个目标声明输入/输出路径（文件或目录）和阶段指纹（任意可 JSON 序列化的值，
+    如配置字典、编码、feature 列表）。输入内容、指纹都未变化，且输出仍与上次
+    构建结果一致的目标会被跳过。
+    目标的输入若是另一目标的输出（或位于其输出目录内），自动依赖该目标；
+    after 用于声明没有文件关系的先后顺序。互不依赖的目标在线程池中并发执行。
+    always=True 的目标每次都执行，inputs 只用于确定依赖顺序，是否需要重新构建由
+    目标自身判断（用于输入不全在本项目中的目标，如外部的 text_hook 项目）。
+
+    文件 hash 按 (大小, mtime) 缓存在状态文件中，没有变化时只需 stat，
+    删除状态文件即可强制完整构建。
+    """
+
+    STATE_VERSION = 1
+
+    def __init__(self, state_path: str = "generated/build_state.json", jobs: int = 4):
+        self.state_path = Path(state_path)
+        self.jobs = jobs
+        self.targets: Dict[str, BuildTarget] = {}
+        self.pipeline = Pipeline()
+        self._lock = threading.Lock()
+        self._file_cache: Dict[str, List] = {}
+        self._records: Dict[str, Dict] = {}
+
+    def target(self, name: str, func: Callable[[], Any], inputs=(), outputs=(),
+               fingerprint=None, after=(), always=False):
+        if name in self.targets:
+            raise ValueError(f"重复的构建目标: {name}")
+        self.targets[name] = BuildTarget(
+            name, func, inputs, outputs, fingerprint, after, always)
+
+    # ---------- hash ----------
+
+    def _file_hash(self, path: Path) -> str:
+        st = path.stat()
+        key = str(path)
+        cached = self._file_cache.get(key)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha1()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            self._file_cache[key] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def path_hash(self, path: str) -> str:
+        """文件为内容 hash，目录为 (相对路径, 内容 hash) 列表的 hash，不存在时为 "missing" """
+        p = Path(path)
+        if p.is_file():
+            return self._file_hash(p)
+        if not p.is_dir():
+            return "missing"
+        h = hashlib.sha1()
+        for f in sorted(q for q in p.rglob("*") if q.is_file()):
+            h.update(f.relative_to(p).as_posix().encode("utf-8"))
+            h.update(self._file_hash(f).encode())
+        return h.hexdigest()
+
+    def _signature(self, t: BuildTarget) -> str:
+        data = json.dumps([t.fingerprint, [(p, self.path_hash(p)) for p in t.inputs]],
+                          ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    # ---------- 调度 ----------
+
+    @staticmethod
+    def _overlaps(a: str, b: str) -> bool:
+        pa, pb = Path(a), Path(b)
+        return pa == pb or pb in pa.parents or pa in pb.parents
+
+    def _resolve_deps(self):
+        for t in self.targets.values():
+            deps = set(t.after)
+            for other in self.targets.values():
+                if other is not t and any(self._overlaps(i, o)
+                                          for i in t.inputs for o in other.outputs):
+                    deps.add(other.name)
+            unknown = deps - self.targets.keys()
+            if unknown:
+                raise ValueError(f"构建目标 {t.name} 依赖不存在的目标: {sorted(unknown)}")
+            t.deps = sorted(deps)
+
+    def _run_target(self, t: BuildTarget):
+        signature = self._signature(t)
+        record = self._records.get(t.name)
+        if (not t.always and record is not None and record["signature"] == signature
+                and all(self.path_hash(o) == record["outputs"].get(o) for o in t.outputs)):
+            self.pipeline.skip(t.name)
+            return
+
+        with self.pipeline.stage(t.name):
+            t.func()
+
+        outputs = {o: self.path_hash(o) for o in t.outputs}
+        with self._lock:
+            self._records[t.name] = {"signature": signature, "outputs": outputs}
+
+    def _load_state(self):
+        try:
+            state = load_json(str(self.state_path))
+            if state["version"] == self.STATE_VERSION:
+                self._records = state["targets"]
+                self._file_cache = state["files"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            save_json({"version": self.STATE_VERSION, "targets": self._records,
+                       "files": self._file_cache}, str(self.state_path))
+
+    def run(self):
+        """按依赖顺序构建全部目标，任一目标失败时等待正在执行的目标结束后抛出异常"""
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        self._resolve_deps()
+        self._load_state()
+
+        pending = dict(self.targets)
+        done = set()
+        error = None
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                running = {}
+                while pending or running:
+                    if error is None:
+                        for name, t in list(pending.items()):
+                            if all(d in done for d in t.deps):
+                                running[pool.submit(self._run_target, t)] = name
+                                del pending[name]
+                    if not running:
+                        if error is None and pending:
+                            raise ValueError(f"构建目标存在循环依赖: {sorted(pending)}")
+                        break
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        name = running.pop(fut)
+                        exc = fut.exception()
+                        if exc is not None:
+                            if error is None:
+                                error = exc
+                            # 已记录的结果可能已被部分覆盖，下次重新构建
+                            with self._lock:
+                                self._records.pop(name, None)
+                        else:
+                            done.add(name)
+        finally:
+            self._save_state()
+
+        self.pipeline.report()
+        if error is not None:
+            raise error
+
+
+def load_json(file_path: str):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(data, file_path: str):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
 def rename_file(original_path, new_name, overwrite=False):
     """
     将原始文件重命名为新的文件名
@@ -152,17 +423,26 @@ def change_file_extensions(directory, old_extension, new_extension, overwrite=Fa
     print(f"操作完成: 成功 {success_count} 个, 失败 {fail_count} 个")
 
 
-def create_cli(extract_func, replace_func, description="CLI 工具", prog_name=None):
-    """创建一个具有 extract 和 replace 子命令的 CLI"""
+def create_cli(extract_func, replace_func, description="CLI 工具", prog_name=None,
+               subprocess_option=False):
+    """
+    创建一个具有 extract 和 replace 子命令的 CLI
+
+    subprocess_option 为 True 时，两个子命令都接受 --subprocess，
+    并以 subprocess_mode 参数传给对应函数（兼容模式：每个阶段在单独的进程中执行）
+    """
     def main():
         parser = argparse.ArgumentParser(
             description=description, prog=prog_name)
         subparsers = parser.add_subparsers(dest="command", help="可用命令")
 
-        subparsers.add_parser(
-            "e", help="执行提取操作").set_defaults(func=extract_func)
-        subparsers.add_parser(
-            "r", help="执行替换操作").set_defaults(func=replace_func)
+        for name, help_text, func in (("e", "执行提取操作", extract_func),
+                                      ("r", "执行替换操作", replace_func)):
+            sp = subparsers.add_parser(name, help=help_text)
+            sp.set_defaults(func=func)
+            if subprocess_option:
+                sp.add_argument("--subprocess", action="store_true",
+                                help="兼容模式：每个阶段启动单独的 Python 进程执行")
 
         args = parser.parse_args()
 
@@ -170,12 +450,15 @@ def create_cli(extract_func, replace_func, description="CLI 工具", prog_name=N
             parser.print_help()
             sys.exit(1)
 
-        args.func()
+        if subprocess_option:
+            args.func(subprocess_mode=args.subprocess)
+        else:
+            args.func()
 
     return main
 
 
-def copy_path(source, destination, overwrite=False):
+def copy_path(source, destination, overwrite=False, sync=False, link=False):
     """
     复制文件或目录到目标位置
 
@@ -183,6 +466,9 @@ def copy_path(source, destination, overwrite=False):
         source (str): 源文件或目录路径
         destination (str): 目标路径
         overwrite (bool): 如果为True，则覆盖已存在的文件/目录；如果为False，则不覆盖
+        sync (bool): 如果为True，则增量同步（隐含覆盖）：只复制大小/mtime/内容有变化的文件，
+                     删除目标中多余的文件，见 sync_path
+        link (bool): sync 模式下尽量使用硬链接，见 sync_path
     """
     source_path = Path(source)
     dest_path = Path(destination)
@@ -195,6 +481,11 @@ def copy_path(source, destination, overwrite=False):
     if dest_path.is_dir() and source_path.is_file():
         dest_path = dest_path / source_path.name
 
+    if sync:
+        changed = sync_path(source_path, dest_path, quick=True, link=link)
+        print(f"同步完成: '{source_path}' -> '{dest_path}'，变化文件数: {changed}")
+        return
+
     # 检查目标路径是否存在
     if dest_path.exists():
         if not overwrite:
@@ -222,7 +513,7 @@ def copy_path(source, destination, overwrite=False):
         raise ValueError(f"源路径 '{source_path}' 不是文件或目录")
 
 
-def merge_directories(source, destination, overwrite=False):
+def merge_directories(source, destination, overwrite=False, sync=False, link=False):
     """
     将源目录合并到目标目录中
 
@@ -230,6 +521,9 @@ def merge_directories(source, destination, overwrite=False):
         source (str): 源目录路径
         destination (str): 目标目录路径
         overwrite (bool): 如果为True，则覆盖已存在的文件；如果为False，则跳过已存在的文件
+        sync (bool): 如果为True，则只复制大小/mtime/内容有变化的文件（隐含覆盖），
+                     同样不会删除目标目录中的其他文件
+        link (bool): sync 模式下尽量使用硬链接，见 sync_path
 
     行为:
         - 将源目录中的所有文件和子目录复制到目标目录
@@ -247,6 +541,12 @@ def merge_directories(source, destination, overwrite=False):
     if not source_path.is_dir():
         raise NotADirectoryError(f"源路径 '{source}' 不是目录")
 
+    if sync:
+        changed = sync_path(source_path, dest_path,
+                            quick=True, link=link, delete=False)
+        print(f"目录合并完成: '{source_path}' -> '{dest_path}'，变化文件数: {changed}")
+        return
+
     # 确保目标目录的父目录存在
     dest_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -303,10 +603,155 @@ def merge_directories(source, destination, overwrite=False):
     print(f"目录合并完成: '{source_path}' -> '{dest_path}'")
 
 
+def _same_content(a: Path, b: Path) -> bool:
+    with a.open("rb") as fa, b.open("rb") as fb:
+        while True:
+            chunk = fa.read(1 << 20)
+            if chunk != fb.read(1 << 20):
+                return False
+            if not chunk:
+                return True
+
+
+def _copy_file_data(source: Path, destination: Path):
+    """
+    复制文件内容，优先使用 copy_file_range（同一文件系统内可由内核直接复制，
+    btrfs/xfs 等会使用 reflink），不支持时退回 shutil.copyfile
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with source.open("rb") as fs, destination.open("wb") as fd:
+                remaining = os.fstat(fs.fileno()).st_size
+                while remaining > 0:
+                    n = os.copy_file_range(fs.fileno(), fd.fileno(), remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+                if remaining == 0:
+                    return
+        except OSError:
+            pass
+    shutil.copyfile(source, destination)
+
+
+def _remove_path(path: Path) -> int:
+    """删除文件或目录，返回删除的文件数"""
+    if path.is_dir() and not path.is_symlink():
+        count = sum(1 for f in path.rglob("*") if not f.is_dir())
+        shutil.rmtree(path)
+        return count
+    path.unlink()
+    return 1
+
+
+def _sync_file(source: Path, destination: Path, source_stat: os.stat_result,
+               dest_stat: os.stat_result | None, quick: bool, link: bool) -> int:
+    if dest_stat is not None:
+        if stat.S_ISDIR(dest_stat.st_mode):
+            _remove_path(destination)
+        else:
+            if dest_stat.st_size == source_stat.st_size:
+                if quick and dest_stat.st_mtime_ns == source_stat.st_mtime_ns:
+                    return 0
+                if _same_content(source, destination):
+                    if quick:
+                        # 内容相同只是 mtime 不同，对齐 mtime 以便下次只需 stat
+                        shutil.copystat(source, destination)
+                    return 0
+            destination.unlink()
+
+    if link:
+        try:
+            os.link(source, destination)
+            return 1
+        except OSError:
+            pass
+    _copy_file_data(source, destination)
+    if quick:
+        shutil.copystat(source, destination)
+    else:
+        shutil.copymode(source, destination)
+    return 1
+
+
+def _sync_dir(source: Path, destination: Path, quick: bool, link: bool, delete: bool) -> int:
+    if destination.exists() and not destination.is_dir():
+        destination.unlink()
+    destination.mkdir(parents=True, exist_ok=True)
+
+    with os.scandir(destination) as it:
+        dest_entries = {e.name: e for e in it}
+
+    changed = 0
+    with os.scandir(source) as it:
+        for entry in it:
+            dest_entry = dest_entries.pop(entry.name, None)
+            dest_item = destination / entry.name
+            if entry.is_dir():
+                changed += _sync_dir(Path(entry.path), dest_item, quick, link, delete)
+            else:
+                dest_stat = None if dest_entry is None else dest_entry.stat(
+                    follow_symlinks=False)
+                changed += _sync_file(Path(entry.path), dest_item,
+                                      entry.stat(), dest_stat, quick, link)
+
+    if delete:
+        for entry in dest_entries.values():
+            changed += _remove_path(destination / entry.name)
+
+    return changed
+
+
+def sync_path(source, destination, quick=False, link=False, delete=True) -> int:
+    """
+    增量同步文件或目录，使目标与源内容一致
+
+    参数:
+        source (str): 源文件或目录路径
+        destination (str): 目标路径
+        quick (bool): 为True时大小和 mtime 都相同即视为未变化，写入时保留源文件的 mtime
+                      （与 shutil.copy2 一致）；为False时总是按内容比较，写入后 mtime
+                      为当前时间，保证 cargo 等依赖 mtime 的工具能察觉变化
+        link (bool): 为True时尽量用硬链接代替复制（失败时退回复制）。
+                     之后原地修改目标文件会同时修改源文件，只用于只读的目标
+        delete (bool): 为True时删除目标目录中源目录里不存在的文件和目录
+
+    行为:
+        - 只写入内容不同或缺失的文件，内容相同的文件不会被触碰
+        - 复制时优先使用 copy_file_range/reflink
+
+    返回:
+        int: 写入或删除的文件数
+    """
+    source_path = Path(source)
+    dest_path = Path(destination)
+
+    if not source_path.exists():
+        raise FileNotFoundError(f"源路径 '{source}' 不存在")
+
+    if source_path.is_dir():
+        return _sync_dir(source_path, dest_path, quick, link, delete)
+
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        dest_stat = dest_path.lstat()
+    except FileNotFoundError:
+        dest_stat = None
+    return _sync_file(source_path, dest_path, source_path.stat(), dest_stat, quick, link)
+
+
 # --------------------------- 特定的编译工具 ----------------------------------
 
 
 class TextHookBuilder:
+    # 复制到 text_hook crate 的资源：assets 下的目录、generated 下的目录和文件
+    ASSET_DIRS = ["font", "hijacked", "x64dbg_1337_patch"]
+    PATCH_DIRS = ["raw", "translated", "raw_text", "translated_text"]
+    CONFIG_FILES = ["mapping.json", "translated.json", "raw.json",
+                    "config.json", "hook_lists.json", "sjis_ext.bin"]
+    # 上次成功构建的指纹，放在 target 中，cargo clean 时一并清除
+    FINGERPRINT_FILE = "text_hook_build_fingerprint"
+
     def __init__(self, project_path):
         """
         初始化 TextHookBuilder
@@ -320,58 +765,87 @@ class TextHookBuilder:
         self.generated_dir = self.current_dir / "generated"
         self.dist_dir = self.current_dir / "generated" / "dist"
 
-    def copy_assets_for_build(self):
+    def input_paths(self) -> List[Path]:
         """
-        复制构建所需的资源文件
+        构建会用到的本地资源路径，只用于确定构建图中的先后顺序；
+        是否需要重新构建只由 build() 中的 fingerprint() 判断
+        """
+        return ([self.current_dir / "assets" / d for d in self.ASSET_DIRS]
+                + [self.generated_dir / d for d in self.PATCH_DIRS]
+                + [self.generated_dir / f for f in self.CONFIG_FILES])
+
+    def dll_path(self) -> Path:
+        """构建产物在 dist 中的路径，hijacked 目录只有一个文件时使用该文件名"""
+        hijacked_dir = self.current_dir / "assets" / "hijacked"
+        if hijacked_dir.exists():
+            hijacked_files = list(hijacked_dir.iterdir())
+            if len(hijacked_files) == 1:
+                return self.dist_dir / hijacked_files[0].name
+        return self.dist_dir / "text_hook.dll"
+
+    def copy_assets_for_build(self) -> int:
+        """
+        同步构建所需的资源文件，只写入内容变化的文件，避免无谓地使 cargo 缓存失效
+
+        返回:
+            int: 写入或删除的文件数
         """
         # 确保 assets 目录存在
         self.assets_dir.mkdir(parents=True, exist_ok=True)
+        changed = 0
 
         # 处理 font 和 hijacked 目录
-        asset_dirs = ["font", "hijacked", "x64dbg_1337_patch"]
-        for dir_name in asset_dirs:
+        for dir_name in self.ASSET_DIRS:
             current_dir = self.current_dir / "assets" / dir_name
             target_dir = self.assets_dir / dir_name
 
             if current_dir.exists() and any(current_dir.iterdir()):
-                print(f"检测到非空的 {dir_name} 目录: {current_dir}")
-
-                # 删除目标目录（如果存在）
-                if target_dir.exists():
-                    shutil.rmtree(target_dir)
-                    print(f"已删除目标 {dir_name} 目录: {target_dir}")
-
-                # 复制当前工作目录的目录到目标位置
-                copy_path(str(current_dir), str(target_dir), overwrite=True)
+                changed += sync_path(current_dir, target_dir)
             else:
                 print(f"{dir_name} 目录不存在或为空: {current_dir}")
 
         # 处理 raw 和 translated 目录
-        patch_dirs = ["raw", "translated", "raw_text", "translated_text"]
-        for dir_name in patch_dirs:
+        for dir_name in self.PATCH_DIRS:
             current_dir = self.generated_dir / dir_name
             target_dir = self.assets_dir / dir_name
 
-            # 删除目标目录（如果存在）
-            if target_dir.exists():
-                shutil.rmtree(target_dir)
-                print(f"已删除: {target_dir}")
-
-            # 复制当前工作目录的目录
             if current_dir.exists():
-                copy_path(str(current_dir), str(
-                    target_dir), overwrite=True)
-            else:
-                print(f"源 {dir_name} 目录不存在: {current_dir}，忽略")
+                changed += sync_path(current_dir, target_dir)
+            elif target_dir.exists():
+                changed += sum(1 for f in target_dir.rglob("*") if f.is_file())
+                shutil.rmtree(target_dir)
+                print(f"源 {dir_name} 目录不存在: {current_dir}，已删除 {target_dir}")
 
         # 处理配置文件
-        config_files = ["mapping.json", "translated.json", "raw.json",
-                        "config.json", "hook_lists.json", "sjis_ext.bin"]
-        for filename in config_files:
+        for filename in self.CONFIG_FILES:
             src_file = self.generated_dir / filename
             if src_file.exists():
-                print(f"复制 {filename}")
-                copy_path(str(src_file), str(self.assets_dir), overwrite=True)
+                changed += sync_path(src_file, self.assets_dir / filename)
+
+        print(f"资源同步完成，变化文件数: {changed}")
+        return changed
+
+    def fingerprint(self, features, panic) -> str:
+        """
+        构建指纹：feature 列表、panic 策略、crate 资源目录的内容 hash，
+        以及项目其余源文件的 (路径, 大小, mtime)（target 和 .git 除外）。
+        资源已由 copy_assets_for_build() 同步到 crate 中，input_paths() 的变化也包含在内
+        """
+        h = hashlib.sha1(json.dumps([features, panic]).encode("utf-8"))
+        for root, dirs, files in os.walk(self.project_path):
+            dirs[:] = sorted(d for d in dirs if not (
+                Path(root) == self.project_path and d in ("target", ".git")))
+            root_path = Path(root)
+            is_asset = root_path == self.assets_dir or self.assets_dir in root_path.parents
+            for name in sorted(files):
+                path = root_path / name
+                h.update(path.relative_to(self.project_path).as_posix().encode("utf-8"))
+                if is_asset:
+                    h.update(hashlib.sha1(path.read_bytes()).digest())
+                else:
+                    st = path.stat()
+                    h.update(f"{st.st_size}:{st.st_mtime_ns}".encode())
+        return h.hexdigest()
 
     def build_dll(self, features, panic="unwind", clean=False):
         """
@@ -421,12 +895,18 @@ class TextHookBuilder:
         # 执行构建命令
         system(build_command, cwd=str(crate_dir))
 
-        # 复制生成的 DLL 文件
-        source_dll = self.project_path / "target" / \
-            "i686-pc-windows-msvc" / "release" / "text_hook.dll"
+        self.copy_dll()
+
+    def target_dll_path(self) -> Path:
+        return self.project_path / "target" / "i686-pc-windows-msvc" / "release" / "text_hook.dll"
+
+    def copy_dll(self):
+        """将 cargo 生成的 DLL 复制到 dist，hijacked 目录只有一个文件时重命名为该文件名"""
+        source_dll = self.target_dll_path()
         if not source_dll.exists():
             raise FileNotFoundError("找不到生成的 DLL 文件")
 
+        self.dist_dir.mkdir(parents=True, exist_ok=True)
         dest_dll = self.dist_dir / "text_hook.dll"
         copy_path(str(source_dll), str(dest_dll), overwrite=True)
 
@@ -457,7 +937,8 @@ class TextHookBuilder:
 
     def build(self, features, panic="unwind", clean=False):
         """
-        完整的构建流程
+        完整的构建流程，构建指纹与上次成功构建一致时跳过 cargo。
+        这是唯一的跳过判断，调用方（如构建图）不应再按其他输入跳过本方法
 
         参数:
             features (str): cargo build 的 features 参数
@@ -467,25 +948,69 @@ class TextHookBuilder:
         print("开始构建流程...")
         print(f"panic 策略: {panic}")
 
-        # 复制资源文件
+        # 同步资源文件
         self.copy_assets_for_build()
-        print("资源文件复制完成")
+
+        # 指纹与上次成功构建一致时不调用 cargo，只把已有的 DLL 复制到 dist
+        fingerprint_file = self.project_path / "target" / self.FINGERPRINT_FILE
+        fingerprint = self.fingerprint(features, panic)
+        if not clean and self.target_dll_path().exists() and fingerprint_file.exists():
+            if fingerprint_file.read_text(encoding="utf-8").strip() == fingerprint:
+                print("构建指纹未变化，跳过 cargo 构建")
+                self.copy_dll()
+                print("构建流程完成")
+                return
+
+        # 构建失败时不能留下旧指纹
+        fingerprint_file.unlink(missing_ok=True)
 
         # 构建 DLL（会临时设置 RUSTFLAGS）
         self.build_dll(features, panic=panic, clean=clean)
+
+        fingerprint_file.parent.mkdir(parents=True, exist_ok=True)
+        fingerprint_file.write_text(fingerprint, encoding="utf-8")
         print("构建流程完成")
 
 
-def json_check():
+def json_check(jobs=1):
     """
     执行 JSON 检查，调用 `python utils_tools/json_check.py raw.json generated/translated.json`
+
+    参数:
+        jobs (int): 并行进程数，输出与串行完全一致（默认 1）
     """
     print("开始 JSON 检查...")
     command = "python utils_tools/json_check.py raw.json generated/translated.json"
+    if jobs > 1:
+        command += f" --jobs {jobs}"
     system(command)
     print("JSON 检查完成")
 
 
+def json_check_data(original: List[Dict], translated: List[Dict], jobs=1):
+    """
+    进程内执行 JSON 检查，与 json_check() 相同，只是直接检查内存中的数据
+    """
+    from utils_tools.json_check import check_items
+
+    print("开始 JSON 检查...")
+    if not check_items(original, translated, jobs):
+        raise RuntimeError("JSON 检查未通过")
+    print("JSON 检查完成")
+
+
+def json_process_data(mode, items: List[Dict]):
+    """
+    进程内处理JSON数据，与 json_process() 相同，只是原地处理内存中的条目
+    """
+    from utils_tools.json_processor import JSONProcessor
+
+    print(f"开始处理JSON数据...")
+    print(f"模式: {mode}, 条目: {len(items)}")
+    JSONProcessor(None, mode).process_items(items)
+    print("JSON数据处理完成")
+
+
 def json_process(mode, file_path):
     """
     处理JSON文件
@@ -563,6 +1088,36 @@ def replace(encoding="CP932", exclude_raw=False, exclude_message=None):
     print("替换流程完成")
 
 
+def replace_data(translated: List[Dict], encoding="CP932", raw: List[Dict] | None = None,
+                 exclude_message=None, output_dir="generated") -> List[Dict]:
+    """
+    进程内执行替换流程，与 replace() 相同，只是直接处理内存中的译文（原地修改并返回）。
+    替身池和字符映射表仍写入 output_dir，raw 不为 None 时与 exclude_raw=True 等价。
+    """
+    from utils_tools import replacement_tool
+
+    print("开始替换流程...")
+
+    datas = [translated]
+    if raw is not None:
+        datas.append(raw)
+    if exclude_message is not None:
+        datas.append([{"message": exclude_message}])
+
+    os.makedirs(output_dir, exist_ok=True)
+    pool = replacement_tool.build_pool(
+        datas, replacement_tool.EncodingType(encoding.lower()))
+    pool.save(Path(output_dir) / "replacement_pool.json")
+    print(f"替换池生成完成，字符数: {len(pool.pool)}")
+
+    replacement_tool.map_items(pool, translated)
+    pool.write_mapping(Path(output_dir) / "mapping.json")
+    print("替换映射应用完成")
+
+    print("替换流程完成")
+    return translated
+
+
 def truncate():
     """
     执行截断流程
@@ -684,6 +1239,33 @@ def split_and_replace(er: list[tuple[str, str]], r_fn_before=None, r_fn_after=No
         json.dump(original_results, f, indent=2, ensure_ascii=False)
 
 
+def extract_and_concat_data(er: List[Callable[[], List[Dict]]]) -> List[Dict]:
+    """
+    进程内版本的 extract_and_concat：依次调用每个提取函数并拼接结果，
+    写出 splits.json，返回拼接后的结果（由调用者决定何时写出 raw.json）
+    """
+    results = []
+    split_idx_list = []
+    for e in er:
+        results.extend(e())
+        split_idx_list.append(len(results))
+
+    save_json(split_idx_list, 'splits.json')
+    return results
+
+
+def split_and_replace_data(er: List[Callable[[List[Dict]], Any]], results: List[Dict]):
+    """
+    进程内版本的 split_and_replace：按 splits.json 将译文拆分后依次传给每个替换函数
+    """
+    split_idx_list = load_json('splits.json')
+
+    idx = 0
+    for i, r in enumerate(er):
+        r(results[idx:split_idx_list[i]])
+        idx = split_idx_list[i]
+
+
 def generate_empty_mapping(code_page=932):
     """
     创建一个空的映射，一般配合`no_text_mapping`使用
@@ -941,6 +1523,69 @@ def de(data: str) -> Tuple[Any, str]:
     return data, "str"
 
 
+# 整数操作数类型 -> (最小值, 最大值, 字节数, 是否有符号)
+INT_TYPES = {
+    "u8": (0, 0xFF, 1, False),
+    "u16": (0, 0xFFFF, 2, False),
+    "u32": (0, 0xFFFFFFFF, 4, False),
+    "i8": (-128, 127, 1, True),
+    "i16": (-32768, 32767, 2, True),
+    "i32": (-2147483648, 2147483647, 4, True),
+}
+
+
+def make_operand(type_str: str, value) -> Tuple[str, Any]:
+    """
+    构造内部使用的带类型操作数 (类型, 值)，字符串操作数直接使用 str
+    """
+    if type_str in INT_TYPES:
+        lo, hi, _, _ = INT_TYPES[type_str]
+        if not isinstance(value, int) or not (lo <= value <= hi):
+            raise ValueError(f"{type_str}值超出范围: {value}")
+        return (type_str, value)
+    if type_str == "bytes" and isinstance(value, (bytes, bytearray)):
+        return ("bytes", bytes(value))
+    raise ValueError(
+        f"类型不匹配或未知类型: type='{type_str}', data={type(value).__name__}")
+
+
+def operand_from_str(data: str):
+    """
+    JSON 边界：将 "u32:5" 形式的字符串转换为 (类型, 值)，普通字符串原样返回
+    """
+    if ":" not in data:
+        return data
+    val, type_str = de(data)
+    if type_str == "str":
+        return val
+    return (type_str, val)
+
+
+def operand_to_str(operand) -> str:
+    """
+    JSON 边界：operand_from_str 的逆过程
+    """
+    if isinstance(operand, tuple):
+        return se(operand[1], operand[0])
+    return operand
+
+
+def operand_to_bytes(operand, byteorder: Literal["little", "big"] = 'little', str_encoding=None) -> bytes:
+    """
+    将带类型操作数转换为字节序列，字符串默认编码为 CP932(带NULL)
+    """
+    if isinstance(operand, tuple):
+        type_str, val = operand
+        if type_str == "bytes":
+            return val
+        _, _, size, signed = INT_TYPES[type_str]
+        return val.to_bytes(size, byteorder, signed=signed)
+
+    if str_encoding is None:
+        return operand.encode("CP932") + b'\x00'
+    return str_encoding(operand)
+
+
 def str_to_bytes(data: str, byteorder: Literal["little", "big"] = 'little', str_encoding=None) -> bytes:
     """
     将序列化字符串转换为字节序列
@@ -119,7 +119,8 @@ class ReplacementPool:
 # -----------------------------
 # 替身池生成
 # -----------------------------
-def generate_pool(paths: list[Path], output: Path, encoding: EncodingType):
+def build_pool(datas: list[list[dict]], encoding: EncodingType) -> ReplacementPool:
+    """根据内存中的若干条目列表生成替身池"""
     pool = set()
 
     # 根据编码范围生成候选字符
@@ -130,34 +131,43 @@ def generate_pool(paths: list[Path], output: Path, encoding: EncodingType):
                 pool.add(ch)
 
     # 剔除文本中已存在的字符
-    for path in paths:
-        data = json.loads(path.read_text(encoding="utf-8"))
+    for data in datas:
         for item in data:
             if "name" in item and item["name"]:
                 pool.difference_update(item["name"])
             pool.difference_update(item["message"])
 
     # 按码点从大到小排序
-    pool_chars = sorted(pool, reverse=True)
+    return ReplacementPool(encoding, sorted(pool, reverse=True))
+
+
+def generate_pool(paths: list[Path], output: Path, encoding: EncodingType):
+    datas = [json.loads(path.read_text(encoding="utf-8")) for path in paths]
+    pool = build_pool(datas, encoding)
 
-    ReplacementPool(encoding, pool_chars).save(output)
-    print(f"成功生成替身池，字符数: {len(pool_chars)}")
+    pool.save(output)
+    print(f"成功生成替身池，字符数: {len(pool.pool)}")
     print(f"保存到: {output}")
 
 
 # -----------------------------
 # 文本映射
 # -----------------------------
+def map_items(pool: ReplacementPool, data: list[dict]):
+    """原地映射内存中条目的 name 和 message"""
+    for item in data:
+        if "name" in item and item["name"]:
+            item["name"] = pool.map_text(item["name"])
+        item["message"] = pool.map_text(item["message"])
+
+
 def map_text(paths: list[Path], output_dir: Path, pool_path: Path):
     pool = ReplacementPool.load(pool_path)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     for path in paths:
         data = json.loads(path.read_text(encoding="utf-8"))
-        for item in data:
-            if "name" in item and item["name"]:
-                item["name"] = pool.map_text(item["name"])
-            item["message"] = pool.map_text(item["message"])
+        map_items(pool, data)
 
         out_path = output_dir / path.name
         out_path.write_text(json.dumps(
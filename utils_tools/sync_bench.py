@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+"""
+copy_path/merge_directories 的复制方式性能对比
+
+在临时目录生成一个类似 generated/ 的目录树，分别计时：
+    - overwrite: 删除目标后整体 copytree（原有方式）
+    - sync:      增量同步，目标已是最新 / 修改少量文件后
+    - sync+link: 增量同步，尽量使用硬链接
+
+用法（在项目根目录）:
+    python -m utils_tools.sync_bench --files 500 --size 16384 --changed 5
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from utils_tools.libs.translate_lib import copy_path
+
+
+def make_tree(root: Path, files: int, size: int, seed: int = 0):
+    """生成 files 个文件，平均分布在若干子目录中"""
+    rng = random.Random(seed)
+    for i in range(files):
+        path = root / f"d{i % 16:02d}" / f"script_{i:05d}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(rng.randbytes(rng.randint(size // 2, size * 3 // 2)))
+
+
+def touch_some(root: Path, count: int, seed: int = 1):
+    """修改其中 count 个文件的内容"""
+    rng = random.Random(seed)
+    files = sorted(p for p in root.rglob("*") if p.is_file())
+    for path in rng.sample(files, min(count, len(files))):
+        data = bytearray(path.read_bytes())
+        data[0] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+
+def timed(name: str, fn, repeat: int, setup=None):
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28} {best * 1000:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比 copy_path 的覆盖复制与增量同步")
+    parser.add_argument("--files", type=int, default=500, help="文件数")
+    parser.add_argument("--size", type=int, default=16384, help="平均文件大小（字节）")
+    parser.add_argument("--changed", type=int, default=5, help="增量测试中修改的文件数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，取最短时间")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "translated"
+        dst = Path(tmp) / "generated" / "translated"
+        make_tree(src, args.files, args.size)
+        total = sum(p.stat().st_size for p in src.rglob("*") if p.is_file())
+        print(f"{args.files} 个文件，共 {total / 1024 / 1024:.1f} MiB")
+
+        with open(os.devnull, "w") as devnull:
+            # 屏蔽 copy_path 的输出
+            quiet = contextlib.redirect_stdout(devnull)
+
+            def overwrite():
+                with quiet:
+                    copy_path(src, dst, overwrite=True)
+
+            def sync(link=False):
+                with quiet:
+                    copy_path(src, dst, sync=True, link=link)
+
+            timed("overwrite", overwrite, args.repeat)
+
+            shutil.rmtree(dst)
+            timed("sync（首次）", sync, 1)
+            timed("sync（无变化）", sync, args.repeat)
+            timed(f"sync（修改 {args.changed} 个文件）", sync, args.repeat,
+                  setup=lambda: touch_some(src, args.changed))
+
+            shutil.rmtree(dst)
+            timed("sync+link（首次）", lambda: sync(True), 1)
+            timed("sync+link（无变化）", lambda: sync(True), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,14 @@
 
 import json
 import sys
+from functools import lru_cache
 from typing import List, Tuple
 
+try:
+    from utils_tools.libs.ac_lib import AhoCorasick
+except ImportError:  # 直接运行 python utils_tools/truncate.py 时
+    from libs.ac_lib import AhoCorasick
+
 # ===== 配置区（手动修改） =====
 RAW_PATH = "raw.json"
 TRANS_PATH = "generated/translated.json"
@@ -32,32 +38,32 @@ def calc_len(s: str) -> int:
     return sum(1 if ord(ch) < 128 else 2 for ch in s)
 
 
+@lru_cache(maxsize=None)
+def token_matcher(tokens: Tuple[str, ...], case_ins: bool) -> AhoCorasick:
+    return AhoCorasick(t.lower() if case_ins else t for t in tokens)
+
+
 def find_trailing_token_run(s: str, tokens: List[str], case_ins: bool) -> int:
     """
     返回尾部连续保护 token-run 的总长度（以 codepoint 计）。
     例如 s='abc@r@r' 且 tokens=['@r'] -> 返回 4（两个 '@r' 各占 2 个 codepoint）。
     不修改原字符串，匹配顺序按 tokens 的顺序（可按需在调用处先按长度降序排序 tokens）。
+    所有 token 的尾部匹配由自动机一次完成，只检查尾部，与 token 数量无关。
     """
     if not s:
         return 0
     s_cmp = s.lower() if case_ins else s
+    matcher = token_matcher(tuple(tokens), case_ins)
     pos = len(s_cmp)
     run_len = 0
     while pos > 0:
-        matched = False
-        # 尝试匹配任一 token 作为当前尾部（按 tokens 顺序匹配）
-        for t in tokens:
-            if not t:
-                continue
-            t_cmp = t.lower() if case_ins else t
-            tlen = len(t_cmp)
-            if pos >= tlen and s_cmp[pos - tlen:pos] == t_cmp:
-                run_len += tlen
-                pos -= tlen
-                matched = True
-                break
+        # 以当前位置结尾的 token 中，取 tokens 顺序最靠前的
+        matched = matcher.suffix_matches(s_cmp, pos)
         if not matched:
             break
+        tlen = len(matcher.patterns[matched[0]])
+        run_len += tlen
+        pos -= tlen
     return run_len
 
 